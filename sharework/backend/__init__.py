@@ -4,6 +4,7 @@ from flask import Flask
 from flask_restful import Api
 
 from sharework import DATA_DIR
+from sharework.backend.cache import ResponseCache
 from sharework.backend.models import Base
 from sharework.backend.views import (
     CompaniesListView, CompanyView, MatchView,
@@ -17,8 +18,16 @@ def init_flask_api() -> Flask:
     # FIXME: This should be a configuration
     db_path = "sqlite:///" + os.path.join(DATA_DIR, "backend_base.sqlite3")
 
+    engine = Base.get_sql_engine(db_path)
+    # Created once per application, each request getting its own session.
+    sessions = Base.session_factory(engine)
+    app.teardown_appcontext(lambda _: sessions.remove())
+
     dependencies = {
-        'engine': Base.get_sql_engine(db_path)
+        'engine': engine,
+        'sessions': sessions,
+        # FIXME: The size and time to live should be a configuration
+        'cache': ResponseCache(max_size=1024, ttl=60.0),
     }
     api.add_resource(CompaniesListView, '/company',
                      resource_class_kwargs=dependencies)
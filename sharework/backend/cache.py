@@ -0,0 +1,103 @@
+"""
+This module defines the cache of the responses of the read endpoints.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional
+
+
+@dataclass
+class CachedResponse:
+    __slots__ = ("body", "headers", "etag", "tags", "expires_at")
+
+    body: Any
+    headers: Dict[str, str]
+    # The entity tag of the body, without quotes.
+    etag: str
+    # The ids of the companies in the body, to invalidate the response.
+    tags: FrozenSet[int]
+    expires_at: float
+
+
+def compute_etag(body: Any) -> str:
+    """Compute a strong entity tag from a marshalled body.
+
+    :param body: The JSON serializable body.
+    :return: The entity tag, without quotes.
+    """
+    serialized = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(serialized.encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0) -> None:
+        """Thread-safe cache of responses, evicting the least recently used
+        entries as well as the ones older than the time to live.
+
+        :param max_size: The maximal amount of entries in the cache.
+        :param ttl: The time to live of an entry, in seconds.
+        """
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """Retrieve the response of the key, if cached and still alive.
+
+        :param key: The key of the response.
+        :return: The cached response, None if absent or expired.
+        """
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                return None
+            if response.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key: Hashable, body: Any, headers: Dict[str, str],
+            tags: Iterable[int]) -> CachedResponse:
+        """Cache the response of the key.
+
+        :param key: The key of the response.
+        :param body: The marshalled body of the response.
+        :param headers: The headers of the response.
+        :param tags: The ids of the companies in the body.
+        :return: The cached response, with its entity tag.
+        """
+        response = CachedResponse(body, dict(headers), compute_etag(body),
+                                  frozenset(tags),
+                                  time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return response
+
+    def invalidate(self, tags: Iterable[int]) -> None:
+        """Remove the responses containing any of the given companies.
+
+        :param tags: The ids of the companies.
+        """
+        tags = frozenset(tags)
+        with self._lock:
+            for key in [key for key, response in self._entries.items()
+                        if response.tags & tags]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Remove all responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
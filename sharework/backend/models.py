@@ -5,28 +5,71 @@ to use the same database.
 
 But for simplicity of queries, we are using an ORM on this side.
 """
-from typing import List, Type, TypeVar
+from typing import List, Optional, Type, TypeVar
 
-from sqlalchemy import Column, ForeignKey, Integer, String, or_
+from sqlalchemy import (
+    Column, ForeignKey, Integer, String, event, or_, select
+)
 from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.ext.declarative import (
     as_declarative, declared_attr
 )
-from sqlalchemy.orm import Query, Session, relationship, sessionmaker
+from sqlalchemy.orm import (
+    Query, Session, joinedload, relationship,
+    scoped_session, sessionmaker
+)
+from sqlalchemy.pool import QueuePool
 
 _T = TypeVar("_T")
 
 
+def _init_sqlite_connection(connection, _) -> None:
+    """Configure each new SQLite connection of an engine."""
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 @as_declarative()
 class Base(object):
     @classmethod
-    def get_sql_engine(cls, db_uri: str) -> Engine:
+    def get_sql_engine(cls, db_uri: str, pool_size: int = 5) -> Engine:
         """Create a new SQL engine from the given DB uri
 
+        The connections to a SQLite file are kept in a pool shared by all
+        threads, in WAL mode so that the readers don't block each other
+        nor the writer.
+
         :param db_uri: The database to use.
+        :param pool_size: The amount of connections kept open.
         :return: A new Engine.
         """
-        return create_engine(db_uri)
+        url = make_url(db_uri)
+        if url.get_backend_name() != "sqlite" or \
+                url.database in (None, "", ":memory:"):
+            return create_engine(db_uri)
+
+        engine = create_engine(
+            db_uri, poolclass=QueuePool, pool_size=pool_size,
+            max_overflow=2 * pool_size,
+            connect_args={"check_same_thread": False}
+        )
+        event.listen(engine, "connect", _init_sqlite_connection)
+        return engine
+
+    @classmethod
+    def session_factory(cls, engine: Engine) -> scoped_session:
+        """Create a registry of sessions on the engine, giving the same
+        session within a thread until it is removed.
+
+        :param engine: The current engine.
+        :return: A new scoped_session.
+        """
+        return scoped_session(sessionmaker(
+            bind=engine, autocommit=False, autoflush=False
+        ))
 
     @classmethod
     def session_from_path(cls, db_uri: str) -> Session:
@@ -57,16 +100,28 @@ class Base(object):
     id = Column(Integer, primary_key=True)
 
     @classmethod
-    def fetch_all(cls: Type[_T], session: Session, limit: int, offset: int) \
-            -> List[_T]:
-        """List all available models withing the given bounds.
+    def fetch_all(cls: Type[_T], session: Session, limit: int, offset: int,
+                  after: int = None) -> List[_T]:
+        """List all available models withing the given bounds,
+        ordered by id.
 
         :param session: The session to query onto.
         :param limit: The limit of results returned.
         :param offset: The query offset.
+        :param after: Only list the models with a greater id. Prefer it to
+        the offset, the skipped models being looked up from the primary key
+        index instead of being scanned.
         :return: A list of Company.
         """
-        return Query(cls, session=session).limit(limit).offset(offset).all()
+        return cls._paginate(Query(cls, session=session),
+                             limit, offset, after).all()
+
+    @classmethod
+    def _paginate(cls, query: Query, limit: int, offset: int,
+                  after: Optional[int]) -> Query:
+        if after is not None:
+            query = query.filter(cls.id > after)
+        return query.order_by(cls.id).limit(limit).offset(offset)
 
     @classmethod
     def fetch_one(cls: Type[_T], session: Session, identifier: int) -> _T:
@@ -95,6 +150,9 @@ class Company(Base):
 
 class Match(Base):
     __tablename__ = "matches"
+    # The ids deleted per statement by delete_all.
+    IDS_PER_STATEMENT = 500
+
     left_company_id = Column(Integer, ForeignKey(Company.id), nullable=False)
     left_company = relationship(Company, foreign_keys=[left_company_id])
 
@@ -111,9 +169,65 @@ class Match(Base):
         session.query(Match).filter_by(id=self.id).delete()
 
     @classmethod
-    def fetch_all(cls, session: Session, limit: int, offset: int,
-                  company_id: int = None) -> List['Match']:
+    def delete_all(cls, session: Session, ids: List[int] = None,
+                   company_id: int = None, source_name: str = None) -> int:
+        """Delete all matches satisfying every given filter at once,
+        in a single statement per IDS_PER_STATEMENT ids.
+
+        :param session: The session to query onto.
+        :param ids: Only delete the matches with one of these ids.
+        :param company_id: Only delete the matches of this company.
+        :param source_name: Only delete the matches with a company of
+        this source.
+        :return: The amount of deleted matches.
+        :raises ValueError: If no filter is given.
+        """
+        if ids is None and company_id is None and source_name is None:
+            raise ValueError("At least one filter is required")
+
         query = Query(cls, session=session)
+        if company_id is not None:
+            query = query.filter(or_(
+                Match.left_company_id == company_id,
+                Match.right_company_id == company_id
+            ))
+        if source_name is not None:
+            companies = select([Company.id]) \
+                .where(Company.source_name == source_name)
+            query = query.filter(or_(
+                Match.left_company_id.in_(companies),
+                Match.right_company_id.in_(companies)
+            ))
+        if ids is None:
+            return query.delete(synchronize_session=False)
+
+        # The amount of bound parameters of a statement is limited,
+        # to 999 in the older SQLite versions.
+        ids = list(ids)
+        step = cls.IDS_PER_STATEMENT
+        return sum(
+            query.filter(Match.id.in_(ids[start:start + step]))
+            .delete(synchronize_session=False)
+            for start in range(0, len(ids), step)
+        )
+
+    @classmethod
+    def fetch_one(cls, session: Session, identifier: int,
+                  with_companies: bool = False) -> Optional['Match']:
+        """Fetch one match from id.
+
+        :param session: The session to query onto.
+        :param identifier: Match identifier.
+        :param with_companies: Load both companies in the same query.
+        :return: A Match, or None if not found.
+        """
+        return cls._query(session, with_companies).get(identifier)
+
+    @classmethod
+    def fetch_all(cls, session: Session, limit: int, offset: int,
+                  company_id: int = None, after: int = None,
+                  with_companies: bool = False) -> List['Match']:
+        query = cls._query(session, with_companies)
 
         if company_id:
             query = query.filter(or_(
@@ -121,5 +235,14 @@ class Match(Base):
                 Match.right_company_id == company_id
             ))
 
-        query = query.limit(limit).offset(offset)
-        return query.all()
+        return cls._paginate(query, limit, offset, after).all()
+
+    @classmethod
+    def _query(cls, session: Session, with_companies: bool) -> Query:
+        query = Query(cls, session=session)
+        if with_companies:
+            # Joined in the same query, instead of one lazy load per match
+            # and company.
+            query = query.options(joinedload(Match.left_company),
+                                  joinedload(Match.right_company))
+        return query
@@ -1,18 +1,127 @@
+import base64
+import binascii
+from typing import Any, Callable, Dict, List, Tuple
+
+from flask import request
 from flask_restful import Resource, fields, marshal, reqparse
 from flask_restful.reqparse import RequestParser
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session
 
+from sharework.backend.cache import ResponseCache
 from sharework.backend.models import Company, Match
 
 
 class ShareworkView(Resource):
-    def __init__(self, engine: Engine) -> None:
+    def __init__(self, engine: Engine, sessions: scoped_session,
+                 cache: ResponseCache) -> None:
         """Holds all commonly injected dependencies.
 
         :param engine: The SQLAlchemy engine used for queries.
+        :param sessions: The sessions of the application, one per request
+        and removed on its teardown.
+        :param cache: The cache of the responses of the read endpoints.
         """
         super().__init__()
         self.engine = engine
+        self.sessions = sessions
+        self.cache = cache
+
+    def _cached(self, respond: Callable[[], Tuple]):
+        """Serve the response of the request from the cache, computing and
+        caching it on a miss. Only the successful responses are cached.
+
+        The response carries an ETag, and is answered with a 304 if
+        matching the If-None-Match header of the request.
+
+        :param respond: Computes the response, as returned by a view, the
+        ids of its body being the ones of the returned companies.
+        :return: The response.
+        """
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        response = self.cache.get(key)
+        if response is None:
+            body, status, *headers = respond()
+            if status != 200:
+                return (body, status, *headers)
+            companies = body if isinstance(body, list) else [body]
+            response = self.cache.put(
+                key, body, headers[0] if headers else {},
+                (company["id"] for company in companies)
+            )
+
+        etag_header = {"ETag": f'"{response.etag}"'}
+        # If-None-Match uses the weak comparison, a proxy compressing the
+        # response weakening its ETag.
+        if request.if_none_match.contains_weak(response.etag):
+            return None, 304, etag_header
+        return response.body, 200, {**response.headers, **etag_header}
+
+
+def encode_cursor(identifier: int) -> str:
+    """Encode the id of the last returned model as an opaque cursor.
+
+    :param identifier: The id to encode.
+    :return: The cursor.
+    """
+    cursor = base64.urlsafe_b64encode(f"id:{identifier}".encode()).decode()
+    # Without padding, to be used as is in a query string.
+    return cursor.rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor from encode_cursor.
+
+    :param cursor: The cursor to decode.
+    :return: The encoded id.
+    :raises ValueError: If the cursor is invalid.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        decoded = base64.urlsafe_b64decode(cursor + padding).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor {cursor}")
+    prefix, _, identifier = decoded.partition(":")
+    if prefix != "id" or not identifier.isdigit():
+        raise ValueError(f"Invalid cursor {cursor}")
+    return int(identifier)
+
+
+class ListView(ShareworkView):
+    # The header holding the cursor of the next page, if any.
+    NEXT_CURSOR_HEADER = "X-Next-Cursor"
+    MAX_LIMIT = 100
+
+    @staticmethod
+    def _index_parser() -> RequestParser:
+        parser = reqparse.RequestParser()
+        parser.add_argument('page', type=int, location='args')
+        parser.add_argument('limit', type=int, location='args')
+        parser.add_argument('after', type=decode_cursor, location='args',
+                            help="Invalid cursor")
+        return parser
+
+    def _bounds(self, args: Dict[str, Any]) -> Tuple[int, int, Dict]:
+        """Compute the pagination arguments of fetch_all. The page is only
+        used if no cursor is given.
+
+        :param args: The parsed arguments of the request.
+        :return: The limit, the offset, and the cursor as keyword arguments.
+        """
+        limit = min(args.get("limit") or self.MAX_LIMIT, self.MAX_LIMIT)
+        if args.get("after") is not None:
+            return limit, 0, {"after": args["after"]}
+        page = args.get("page") or 0
+        return limit, page * limit, {}
+
+    def _paginated(self, models: List[Any], marshal_fields: Dict[str, Any],
+                   limit: int):
+        """Marshal a page of models, with the cursor of the next page in
+        the NEXT_CURSOR_HEADER if the page is full."""
+        headers = {}
+        if models and len(models) == limit:
+            headers[self.NEXT_CURSOR_HEADER] = encode_cursor(models[-1].id)
+        return marshal(models, marshal_fields), 200, headers
 
 
 class MatchView(ShareworkView):
@@ -21,27 +130,54 @@ class MatchView(ShareworkView):
         'left_company_id': fields.Integer(),
         'right_company_id': fields.Integer(),
     }
+    EXPAND_COMPANIES = "companies"
+    EXPAND_ARGUMENT = reqparse.Argument('expand', location='args',
+                                        choices=(EXPAND_COMPANIES,))
 
-    def get(self, match_id: int):
-        session = Match.session_from_engine(self.engine)
-        match = Match.fetch_one(session, match_id)
+    @staticmethod
+    def _expand_parser() -> RequestParser:
+        parser = reqparse.RequestParser()
+        parser.add_argument(MatchView.EXPAND_ARGUMENT)
+        return parser
+
+    @staticmethod
+    def expansion(args: Dict[str, Any]) -> Tuple[Dict, Dict[str, Any]]:
+        """Compute the fetch arguments and the marshalling of the matches
+        from the expand argument of the request.
 
-        session.close()
+        :param args: The parsed arguments of the request.
+        :return: The keyword arguments of the fetch methods,
+        and the fields to marshal.
+        """
+        if args.get("expand") != MatchView.EXPAND_COMPANIES:
+            return {}, MatchView.MARSHAL_MATCH
+        return {"with_companies": True}, {
+            **MatchView.MARSHAL_MATCH,
+            'left_company': fields.Nested(CompanyView.MARSHAL_COMPANY),
+            'right_company': fields.Nested(CompanyView.MARSHAL_COMPANY),
+        }
+
+    def get(self, match_id: int):
+        options, marshal_fields = self.expansion(
+            self._expand_parser().parse_args()
+        )
+        match = Match.fetch_one(self.sessions(), match_id, **options)
 
         if not match:
             return {}, 404
-        return marshal(match, self.MARSHAL_MATCH), 200
+        return marshal(match, marshal_fields), 200
 
     def delete(self, match_id: int):
-        session = Match.session_from_engine(self.engine)
+        session = self.sessions()
         match = Match.fetch_one(session, match_id)
 
         if not match:
-            session.close()
             return {}, 404
 
         match.delete(session)
         session.commit()
+        self.cache.invalidate((match.left_company_id,
+                               match.right_company_id))
         return marshal(match, self.MARSHAL_MATCH), 200
 
 
@@ -60,58 +196,79 @@ class CompanyView(ShareworkView):
     }
 
     def get(self, company_id: int):
-        session = Company.session_from_engine(self.engine)
-        company = Company.fetch_one(session, company_id)
-        session.close()
+        return self._cached(lambda: self._get(company_id))
+
+    def _get(self, company_id: int):
+        company = Company.fetch_one(self.sessions(), company_id)
 
         if not company:
             return {}, 404
         return marshal(company, self.MARSHAL_COMPANY), 200
 
 
-class MatchesListViews(ShareworkView):
+class MatchesListViews(ListView):
     @staticmethod
     def _index_parser() -> RequestParser:
-        parser = reqparse.RequestParser()
+        parser = ListView._index_parser()
         parser.add_argument('company', type=int, location='args')
-        parser.add_argument('page', type=int, location='args')
-        parser.add_argument('limit', type=int, location='args')
+        parser.add_argument(MatchView.EXPAND_ARGUMENT)
         return parser
 
     def get(self):
         args = self._index_parser().parse_args()
-        page = args.get("page") or 0
-        limit = args.get("limit") or 100
-        if limit > 100:
-            limit = 100
-
-        session = Match.session_from_engine(self.engine)
-        matches = Match.fetch_all(session, limit, page * limit,
-                                  args.get('company'))
-        session.close()
+        limit, offset, cursor = self._bounds(args)
+        options, marshal_fields = MatchView.expansion(args)
 
-        return marshal(matches, MatchView.MARSHAL_MATCH), 200
+        matches = Match.fetch_all(self.sessions(), limit, offset,
+                                  args.get('company'), **cursor, **options)
 
+        return self._paginated(matches, marshal_fields, limit)
 
-class CompaniesListView(ShareworkView):
+    @staticmethod
+    def _delete_parser() -> RequestParser:
+        parser = reqparse.RequestParser()
+        parser.add_argument('company', type=int, location='args')
+        parser.add_argument('source', location='args')
+        return parser
 
     @staticmethod
-    def _index_parser() -> RequestParser:
-        # TODO: We can propose more filtering parameters like data source.
+    def _delete_body_parser() -> RequestParser:
+        # The ids are read from the body, thousands of them not fitting
+        # in the request line.
         parser = reqparse.RequestParser()
-        parser.add_argument('page', type=int, location='args')
-        parser.add_argument('limit', type=int, location='args')
+        parser.add_argument('ids', type=int, action='append', location='json')
         return parser
 
+    def delete(self):
+        args = self._delete_parser().parse_args()
+        if request.get_data():
+            args.update(self._delete_body_parser().parse_args())
+        session = self.sessions()
+        try:
+            deleted = Match.delete_all(session, args.get('ids'),
+                                       args.get('company'),
+                                       args.get('source'))
+        except ValueError as error:
+            return {"message": str(error)}, 400
+
+        session.commit()
+        if deleted:
+            # The companies of the deleted matches are not known.
+            self.cache.clear()
+        return {"deleted": deleted}, 200
+
+
+class CompaniesListView(ListView):
+    # TODO: We can propose more filtering parameters like data source.
+
     def get(self):
+        return self._cached(self._get)
+
+    def _get(self):
         args = self._index_parser().parse_args()
-        page = args.get("page") or 0
-        limit = args.get("limit") or 100
-        if limit > 100:
-            limit = 100
+        limit, offset, cursor = self._bounds(args)
 
-        session = Company.session_from_engine(self.engine)
-        companies = Company.fetch_all(session, limit, page * limit)
-        session.close()
+        companies = Company.fetch_all(self.sessions(), limit, offset,
+                                      **cursor)
 
-        return marshal(companies, CompanyView.MARSHAL_COMPANY), 200
+        return self._paginated(companies, CompanyView.MARSHAL_COMPANY, limit)
@@ -4,12 +4,19 @@ from logging import config
 from typing import Tuple
 
 from sharework import DATA_DIR, RESOURCES_DIR
+from sharework.matching.columnar import NumpyDataDumper
+from sharework.matching.criterion import PhoneCriterion
+from sharework.matching.executor import PROCESS_BACKEND
+from sharework.matching.index import IndexedMatcher
 from sharework.matching.loader import (
     CSVDataLoader, DataLoader,
-    SQLiteDataLoader
+    SQLiteDataLoader, SnapshotDataLoader
+)
+from sharework.matching.matcher import CompanyMatcher, SourcesMatcher
+from sharework.matching.persistence import (
+    AsyncDataDumper, CSVDataDumper,
+    SqliteDataDumper
 )
-from sharework.matching.matcher import SourcesMatcher
-from sharework.matching.persistence import CSVDataDumper, SqliteDataDumper
 
 config.fileConfig(os.path.join(RESOURCES_DIR, "logging.config"))
 logger = logging.getLogger()
@@ -27,42 +34,72 @@ def main():
     # source_a, source_b = _csv_loaders()
     # dumper = CSVDataDumper(os.path.join(DATA_DIR, "out.csv"))
 
+    # Use the columnar output
+    # dumper = NumpyDataDumper(os.path.join(DATA_DIR, "out"), criteria=[
+    #     criterion.name for criterion in CompanyMatcher.DEFAULT_CRITERIA
+    # ])
+
     # Use SQLite
     source_a, source_b = _sqlite_loaders()
-    dumper = SqliteDataDumper(os.path.join(DATA_DIR, "matching_base.sqlite3"))
+    dumper = SqliteDataDumper(
+        os.path.join(DATA_DIR, "matching_base.sqlite3"),
+        criteria=[criterion.name
+                  for criterion in CompanyMatcher.DEFAULT_CRITERIA]
+    )
 
-    comparator = SourcesMatcher(source_a, source_b, worker_amount=5)
+    # Persist the matches from a writer thread while matching.
+    dumper = AsyncDataDumper(dumper)
+
+    # Look up the matching companies from an index of the source B,
+    # instead of comparing every pair.
+    # Each process receives both sources once, then ranges of source A.
+    comparator = SourcesMatcher(source_a, source_b,
+                                worker_amount=os.cpu_count(),
+                                engine=IndexedMatcher,
+                                backend=PROCESS_BACKEND,
+                                max_pending_bytes=64 * 1024 * 1024)
     comparator.matcher.strict = True
+    comparator.matcher.threshold = threshold
     logger.info("Starting datasource comparison")
-    for future in comparator.compare():
+    for future in comparator.compare_rows(chunk_size=32):
         try:
-            match = future.result(timeout=timeout_seconds)
+            matches = future.result(timeout=timeout_seconds)
         except TimeoutError:
             logger.error("We have some performance issues on comparison")
         else:
-            if match.score >= threshold:
+            for match in matches:
                 logger.info(f"We have a match "
                             f"between {match.company_a.name} "
                             f"and {match.company_b.name} ({match.score})")
-                dumper.add(match)
+            dumper.add_all(matches)
 
-    dumper.flush()
+    dumper.close()
 
     comparator.stop()
+    # The processes have their own caches, only the ones of the main
+    # process are reported.
+    logger.info(f"Phone cache: {PhoneCriterion.PHONE_CACHE}")
+    logger.info(f"Country cache: {PhoneCriterion.COUNTRY_CACHE}")
     logger.info("Matching done.")
 
 
 def _sqlite_loaders() -> Tuple[DataLoader, DataLoader]:
     db_path = os.path.join(DATA_DIR, "matching_base.sqlite3")
-    source_a = SQLiteDataLoader(db_path, "dataset_A.csv")
-    source_b = SQLiteDataLoader(db_path, "dataset_B.csv")
+    source_a = SQLiteDataLoader(db_path, "dataset_A.csv", chunk_size=1000)
+    source_b = SQLiteDataLoader(db_path, "dataset_B.csv", chunk_size=1000)
+    # Not snapshotted, its version being unknown without reading it.
     return source_a, source_b
 
 
 def _csv_loaders() -> Tuple[DataLoader, DataLoader]:
     source_a = CSVDataLoader(os.path.join(DATA_DIR, "dataset_A.csv"))
     source_b = CSVDataLoader(os.path.join(DATA_DIR, "dataset_B.csv"))
-    return source_a, source_b
+    # Only parsed again when the file of a source changes.
+    snapshots_dir = os.path.join(DATA_DIR, "snapshots")
+    return (SnapshotDataLoader(source_a,
+                               os.path.join(snapshots_dir, "dataset_A")),
+            SnapshotDataLoader(source_b,
+                               os.path.join(snapshots_dir, "dataset_B")))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,170 @@
+"""
+This module defines the blocking stage of the matching engine.
+
+Comparing every company of a data source with every company of another one
+grows quadratically with the sources size. The blocking stage groups the
+companies under keys built from their criterion fields, so that only
+companies sharing at least one key (a block) are compared together.
+"""
+import logging
+import re
+from abc import ABC
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set
+
+from sharework.matching.criterion import (
+    DomainNameCriterion, FieldCriterion,
+    PhoneCriterion, PostalCodeCriterion
+)
+from sharework.matching.model import Company
+
+logger = logging.getLogger()
+
+
+class BlockingKey(ABC):
+    def keys(self, company: Company) -> Set[str]:
+        """Compute the blocking keys of the given company.
+
+        :param company: The company to compute the keys from.
+        :return: The set of keys, empty if the company can't be blocked.
+        """
+        raise NotImplementedError
+
+
+class CriterionBlockingKey(BlockingKey):
+    def __init__(self, criterion: FieldCriterion) -> None:
+        """Use the normalized field of a criterion as blocking key.
+
+        Two companies sharing this key are matching for the criterion,
+        so this blocking key does not lose any match of the criterion.
+
+        :param criterion: The criterion to extract the field from.
+        """
+        super().__init__()
+        self.criterion = criterion
+
+    def keys(self, company: Company) -> Set[str]:
+        field = self.criterion.prepare(company)
+        if field is None:
+            return set()
+        return {f"{self.criterion.name}:{field}"}
+
+
+class NameTokenBlockingKey(BlockingKey):
+    TOKEN_SEPARATOR = re.compile(r"\W+")
+
+    def __init__(self, min_length: int = 3) -> None:
+        """Use every word of the company name as a blocking key.
+
+        This is an approximation of the NameContainedCriterion,
+        we only find the names contained in one another on word boundaries.
+
+        :param min_length: The minimal length of a word to be used as key,
+        to avoid creating huge blocks with articles and abbreviations.
+        """
+        super().__init__()
+        self.criterion = FieldCriterion("name", 1)
+        self.min_length = min_length
+
+    def keys(self, company: Company) -> Set[str]:
+        name = self.criterion.prepare(company)
+        if name is None:
+            return set()
+        return {
+            f"{self.__class__.__name__}:{token}"
+            for token in self.TOKEN_SEPARATOR.split(name)
+            if len(token) >= self.min_length
+        }
+
+
+@dataclass
+class BlockingStats:
+    total_pairs: int = 0
+    candidate_pairs: int = 0
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Ratio of pairs that were not submitted to the matcher."""
+        if not self.total_pairs:
+            return 0.0
+        return 1 - self.candidate_pairs / self.total_pairs
+
+
+class Blocker:
+    DEFAULT_KEYS = [
+        CriterionBlockingKey(DomainNameCriterion()),
+        CriterionBlockingKey(PhoneCriterion()),
+        CriterionBlockingKey(PostalCodeCriterion()),
+        CriterionBlockingKey(FieldCriterion("name", 1)),
+        NameTokenBlockingKey(),
+    ]
+
+    def __init__(self, keys: List[BlockingKey] = None,
+                 max_block_size: int = None,
+                 strict: bool = False) -> None:
+        """Generate the candidate pairs sharing at least one block.
+
+        The blocker first indexes one of the data sources, then gives for
+        each company of the other source the position of its candidates
+        in the indexed source.
+
+        :param keys: The list of blocking keys to use.
+        :param max_block_size: Blocks holding more indexed companies than
+        this size are ignored, trading some recall against runtime.
+        :param strict: If True, the pairs without any common block are still
+        reported as not matching instead of being skipped.
+        """
+        super().__init__()
+        if not keys:
+            keys = self.DEFAULT_KEYS
+        self.keys = keys
+        self.max_block_size = max_block_size
+        self.strict = strict
+        self.blocks: Dict[str, List[int]] = {}
+        self.stats = BlockingStats()
+
+    def company_keys(self, company: Company) -> Set[str]:
+        """Compute all blocking keys of the given company.
+
+        :param company: The company to compute the keys from.
+        :return: The union of all keys.
+        """
+        keys = set()
+        for blocking_key in self.keys:
+            keys.update(blocking_key.keys(company))
+        return keys
+
+    def index(self, companies: Iterable[Company]) -> None:
+        """Index the companies in their blocks, replacing the previous index.
+
+        :param companies: The companies to index, their position in this
+        iterable is used as identifier.
+        """
+        blocks = defaultdict(list)
+        for position, company in enumerate(companies):
+            for key in self.company_keys(company):
+                blocks[key].append(position)
+
+        if self.max_block_size is not None:
+            oversized = [key for key, positions in blocks.items()
+                         if len(positions) > self.max_block_size]
+            logger.info(f"Ignoring {len(oversized)} blocks with more than "
+                        f"{self.max_block_size} companies")
+            for key in oversized:
+                del blocks[key]
+
+        self.blocks = dict(blocks)
+        self.stats = BlockingStats()
+
+    def candidates(self, company: Company) -> Set[int]:
+        """Retrieve the position of all indexed companies sharing at least
+        one block with the given company.
+
+        :param company: The company to find candidates for.
+        :return: The set of candidates positions in the indexed companies.
+        """
+        candidates = set()
+        for key in self.company_keys(company):
+            candidates.update(self.blocks.get(key, ()))
+        return candidates
@@ -0,0 +1,70 @@
+"""
+This module defines the caches shared by the matching engine.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    def __init__(self, max_size: int) -> None:
+        """Thread-safe cache evicting the least recently used entries,
+        keeping counters of its usage.
+
+        :param max_size: The maximal amount of entries in the cache.
+        """
+        super().__init__()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Retrieve the value of the key, computing and caching it if absent.
+
+        :param key: The key of the value.
+        :param compute: Computes the value on a cache miss.
+        :return: The cached or computed value.
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of lookups found in the cache."""
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return self.hits / lookups
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return (f"{len(self)}/{self.max_size} entries, "
+                f"{self.hits} hits, {self.misses} misses, "
+                f"{self.evictions} evictions "
+                f"(hit rate {self.hit_rate:.2%})")
@@ -0,0 +1,186 @@
+"""
+This module defines the columnar output format of the matches.
+
+The matches are written in row groups, each column of a row group being a
+NumPy .npy file, which can be memory-mapped when loaded. The strings are
+encoded as positions in a table kept in the metadata.json file:
+
+    metadata.json
+    company_a_source.0.npy, company_a_id.0.npy, ..., success_criteria.0.npy
+    company_a_source.1.npy, ...
+
+NumPy is an optional dependency, available through the 'columnar' extra.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, Generator, List
+
+from sharework.matching.model import CompanyMatch
+from sharework.matching.persistence import DataDumper
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger()
+
+METADATA_FILE = "metadata.json"
+# The type of each column, the sources being positions in the string table.
+COLUMNS = {
+    "company_a_source": "int32",
+    "company_a_id": "int64",
+    "company_b_source": "int32",
+    "company_b_id": "int64",
+    "score": "float32",
+    "success_criteria": "int64",
+}
+
+
+class NumpyDataDumper(DataDumper):
+    def __init__(self, path: str, criteria: List[str] = None,
+                 row_group_size: int = 100000) -> None:
+        """Create a new columnar output directory to contain all matches.
+        The row groups are appended to the existing output, if any.
+
+        :param path: Path to the directory to generate.
+        :param criteria: The name of each criterion of the matcher, stored
+        in the metadata to decode the success_criteria bitmasks.
+        :param row_group_size: The amount of matches per row group.
+        :raises ImportError: If NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("The columnar output requires numpy, "
+                              "install the 'columnar' extra")
+        super().__init__()
+        self.path = path
+        self.row_group_size = row_group_size
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, METADATA_FILE)):
+            self.metadata = read_metadata(path)
+        else:
+            self.metadata = {"columns": COLUMNS, "strings": [],
+                             "criteria": [], "row_groups": []}
+        if criteria is not None:
+            self.metadata["criteria"] = list(criteria)
+        self._string_codes = {string: code for code, string
+                              in enumerate(self.metadata["strings"])}
+        self._columns = {name: np.empty(row_group_size, dtype=dtype)
+                         for name, dtype in COLUMNS.items()}
+        self._size = 0
+
+    def add(self, data: CompanyMatch) -> None:
+        position = self._size
+        self._columns["company_a_source"][position] = \
+            self._encode(data.company_a.source_name)
+        self._columns["company_a_id"][position] = int(data.company_a.source_id)
+        self._columns["company_b_source"][position] = \
+            self._encode(data.company_b.source_name)
+        self._columns["company_b_id"][position] = int(data.company_b.source_id)
+        self._columns["score"][position] = data.score
+        self._columns["success_criteria"][position] = data.success_criteria
+        self._size += 1
+        if self._size == self.row_group_size:
+            self._write_row_group()
+
+    def add_all(self, data: List[CompanyMatch]) -> None:
+        start = 0
+        while start < len(data):
+            batch = data[start:start + self.row_group_size - self._size]
+            stop = self._size + len(batch)
+            values = {
+                "company_a_source": (self._encode(match.company_a.source_name)
+                                     for match in batch),
+                "company_a_id": (int(match.company_a.source_id)
+                                 for match in batch),
+                "company_b_source": (self._encode(match.company_b.source_name)
+                                     for match in batch),
+                "company_b_id": (int(match.company_b.source_id)
+                                 for match in batch),
+                "score": (match.score for match in batch),
+                "success_criteria": (match.success_criteria
+                                     for match in batch),
+            }
+            for name, column in values.items():
+                self._columns[name][self._size:stop] = np.fromiter(
+                    column, dtype=COLUMNS[name], count=len(batch)
+                )
+            self._size = stop
+            start += len(batch)
+            if self._size == self.row_group_size:
+                self._write_row_group()
+
+    def flush(self) -> None:
+        """Write the pending matches as a row group, smaller than the others,
+        along with the metadata."""
+        if self._size:
+            self._write_row_group()
+        self._write_metadata()
+
+    def _encode(self, string: str) -> int:
+        code = self._string_codes.get(string)
+        if code is None:
+            code = self._string_codes[string] = len(self._string_codes)
+            self.metadata["strings"].append(string)
+        return code
+
+    def _write_row_group(self) -> None:
+        group = len(self.metadata["row_groups"])
+        for name, column in self._columns.items():
+            np.save(_column_path(self.path, name, group), column[:self._size])
+        self.metadata["row_groups"].append({"rows": self._size})
+        logger.debug(f"Written row group {group} of {self._size} matches")
+        self._size = 0
+        # The metadata always describes complete row groups.
+        self._write_metadata()
+
+    def _write_metadata(self) -> None:
+        path = os.path.join(self.path, METADATA_FILE)
+        with open(f"{path}.tmp", "w") as metadata_file:
+            json.dump(self.metadata, metadata_file)
+        os.replace(f"{path}.tmp", path)
+
+
+def _column_path(path: str, name: str, group: int) -> str:
+    return os.path.join(path, f"{name}.{group}.npy")
+
+
+def read_metadata(path: str) -> Dict[str, Any]:
+    """Read the metadata of a columnar output directory.
+
+    :param path: Path to the directory.
+    :return: The metadata, with the type of each column, the string table,
+    the criteria names and the size of each row group.
+    """
+    with open(os.path.join(path, METADATA_FILE), "r") as metadata_file:
+        return json.load(metadata_file)
+
+
+def iter_row_groups(path: str) \
+        -> Generator[Dict[str, 'np.ndarray'], None, None]:
+    """Load the row groups of a columnar output directory, each column
+    being memory-mapped instead of read.
+
+    :param path: Path to the directory.
+    :return: A Generator of the columns of each row group.
+    """
+    metadata = read_metadata(path)
+    for group in range(len(metadata["row_groups"])):
+        yield {name: np.load(_column_path(path, name, group), mmap_mode="r")
+               for name in metadata["columns"]}
+
+
+def load_matches(path: str) -> Dict[str, 'np.ndarray']:
+    """Load all matches of a columnar output directory in memory.
+    The sources are decoded with the string table of read_metadata, and the
+    criteria with decode_criteria and its criteria names.
+
+    :param path: Path to the directory.
+    :return: The columns of all matches.
+    """
+    metadata = read_metadata(path)
+    groups = list(iter_row_groups(path))
+    return {name: np.concatenate([group[name] for group in groups])
+            if groups else np.empty(0, dtype=dtype)
+            for name, dtype in metadata["columns"].items()}
@@ -11,11 +11,12 @@ Potential future criteria:
 
 import logging
 from abc import ABC
-from typing import Optional
+from typing import Any, Hashable, Optional, Tuple
 
 import phonenumbers
 import pycountry
 
+from sharework.matching.cache import LRUCache
 from sharework.matching.model import Company
 
 logger = logging.getLogger()
@@ -41,6 +42,50 @@ class CompanyCriterion(ABC):
         """
         raise NotImplementedError
 
+    def prepare(self, company: Company) -> Any:
+        """Extract and normalize once the data used by the criterion,
+        so that it can be compared to many companies afterwards.
+
+        :param company: The company to prepare.
+        :return: The prepared value, the company itself by default.
+        """
+        return company
+
+    def compare_prepared(self, one: Any, two: Any) -> Optional[bool]:
+        """Compute if the two given prepared values are matching given the
+        current criterion.
+
+        :param one: The prepared value of the first company.
+        :param two: The prepared value of the second company.
+        :return: True if both companies matches for the criterion,
+        False otherwise.
+        """
+        return self.match(one, two)
+
+    @property
+    def cost(self) -> int:
+        """Relative cost of comparing two prepared values, used to evaluate
+        the cheapest criteria first.
+        """
+        return 1
+
+    @property
+    def indexable(self) -> bool:
+        """Tells if the criterion is an equality on the prepared values,
+        in which case the matching companies can be retrieved from an index
+        on their index_key.
+        """
+        return False
+
+    def index_key(self, prepared: Any) -> Optional[Hashable]:
+        """Compute the key of the prepared value in an equality index.
+        Two companies are matching if and only if they have the same key.
+
+        :param prepared: The prepared value of the company.
+        :return: The key to index, None if the company can't match.
+        """
+        raise NotImplementedError
+
     @property
     def name(self) -> str:
         raise NotImplementedError
@@ -86,13 +131,25 @@ class FieldCriterion(CompanyCriterion):
         :return: True if both companies matches for the criterion,
         False otherwise.
         """
+        return self.compare_prepared(self.prepare(one), self.prepare(two))
+
+    def prepare(self, company: Company) -> Optional[str]:
+        """Extract the normalized field of the company.
+
+        :param company: The company to prepare.
+        :return: The normalized field, None if not existing.
+        """
         try:
-            fields = [self._extract_field(company) for company in (one, two)]
+            return self._extract_field(company)
         except AttributeError:
             logger.debug(f"Unavailable attribute {self.field}")
             return None
-        else:
-            return self._compare(*fields)
+
+    def compare_prepared(self, one: Optional[str],
+                         two: Optional[str]) -> Optional[bool]:
+        if one is None or two is None:
+            return None
+        return self._compare(one, two)
 
     def _compare(self, field_one: str, field_two: str) -> bool:
         """Compare the two fields to check if the companies are matching for
@@ -104,6 +161,14 @@ class FieldCriterion(CompanyCriterion):
         """
         return field_one == field_two
 
+    @property
+    def indexable(self) -> bool:
+        # Subclasses may compare the fields with something else than equality.
+        return type(self)._compare is FieldCriterion._compare
+
+    def index_key(self, prepared: Optional[str]) -> Optional[Hashable]:
+        return prepared
+
     @property
     def name(self) -> str:
         return f"{self.__class__.__name__}:{self.field}"
@@ -118,6 +183,11 @@ class NameContainedCriterion(FieldCriterion):
     def _compare(self, field_one: str, field_two: str) -> bool:
         return field_one in field_two or field_two in field_one
 
+    @property
+    def cost(self) -> int:
+        # Searching a substring is slower than an equality.
+        return 2
+
     @property
     def name(self) -> str:
         return self.__class__.__name__
@@ -151,20 +221,47 @@ class AddressCriterion(CompanyCriterion):
         ]
 
     def match(self, one: Company, two: Company) -> Optional[bool]:
-        for criterion in self.criteria:
-            match = criterion.match(one, two)
+        return self.compare_prepared(self.prepare(one), self.prepare(two))
+
+    def prepare(self, company: Company) -> Tuple[Any, ...]:
+        return tuple(criterion.prepare(company) for criterion in self.criteria)
+
+    def compare_prepared(self, one: Tuple[Any, ...],
+                         two: Tuple[Any, ...]) -> Optional[bool]:
+        for criterion, field_one, field_two in zip(self.criteria, one, two):
+            match = criterion.compare_prepared(field_one, field_two)
             if not match:
                 # Either False or None gets returned as-is since
                 # we won't have enough data to be certain.
                 return match
         return True
 
+    @property
+    def cost(self) -> int:
+        return sum(criterion.cost for criterion in self.criteria)
+
+    @property
+    def indexable(self) -> bool:
+        return all(criterion.indexable for criterion in self.criteria)
+
+    def index_key(self, prepared: Tuple[Any, ...]) -> Optional[Hashable]:
+        keys = tuple(criterion.index_key(field)
+                     for criterion, field in zip(self.criteria, prepared))
+        if None in keys:
+            return None
+        return keys
+
     @property
     def name(self) -> str:
         return self.__class__.__name__
 
 
 class PhoneCriterion(FieldCriterion):
+    # Shared by all instances, parsing a phone number is expensive and the
+    # same numbers are normalized again by every criterion and data source.
+    PHONE_CACHE = LRUCache(max_size=100000)
+    COUNTRY_CACHE = LRUCache(max_size=1000)
+
     def __init__(self, weight: int = 3) -> None:
         """This criterion is a match if the complete Address is matching
         between the two companies.
@@ -176,27 +273,60 @@ class PhoneCriterion(FieldCriterion):
         We try to parse the number in two times to avoid misleading the library
         in case of a phone number not from the same country as the company HQ.
 
+        The result is cached on the number and country, parsing failures
+        included.
+
         :param field: The phone number to normalize.
         :param country: The company HQ country.
         :return: The normalized phone number if parsing successful.
         :raise AttributeError: If we can't parse the phone number correctly.
         """
+        normalized = self.PHONE_CACHE.get(
+            (field, country), lambda: self._parse(field, country)
+        )
+        if normalized is None:
+            raise AttributeError
+        return normalized
+
+    def _parse(self, field, country: Optional[str]) -> Optional[str]:
+        """Parse the number, see _normalize.
+
+        :return: The normalized phone number, None if parsing failed.
+        """
         try:
             number = phonenumbers.parse(field, None)
         except phonenumbers.phonenumberutil.NumberParseException:
             logger.debug(f"Unable to parse phone {field} without country")
+            iso2 = self.COUNTRY_CACHE.get(
+                country, lambda: self._country_code(country)
+            )
             try:
-                country = country.capitalize()
-                iso2 = pycountry.countries.get(name=country).alpha_2
+                if iso2 is None:
+                    raise KeyError(country)
                 number = phonenumbers.parse(field, iso2)
             except (phonenumbers.phonenumberutil.NumberParseException,
                     KeyError):
                 logger.debug(f"Unable to parse phone {field} "
                              f"with country {country}")
-                raise AttributeError
+                return None
         return phonenumbers.format_number(number,
                                           phonenumbers.PhoneNumberFormat.E164)
 
+    @staticmethod
+    def _country_code(country: Optional[str]) -> Optional[str]:
+        """Find the ISO 3166 alpha 2 code of a country from its name.
+
+        :param country: The name of the country.
+        :return: The country code, None if not found.
+        """
+        if country is None:
+            return None
+        try:
+            found = pycountry.countries.get(name=country.capitalize())
+        except KeyError:
+            return None
+        return None if found is None else found.alpha_2
+
     def _extract_field(self, company: Company) -> str:
         field = getattr(company, self.field)
         if field is None or not str(field):
@@ -0,0 +1,152 @@
+"""
+This module defines the execution backends available to run the matching.
+
+- thread: A pool of threads, sharing the memory but limited by the GIL.
+- process: A pool of processes, scaling with the amount of cores.
+- inline: Run each task synchronously on submission, mostly to debug.
+"""
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import ProcessPoolExecutor
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generator, Iterable, Set, Tuple
+
+THREAD_BACKEND = "thread"
+PROCESS_BACKEND = "process"
+INLINE_BACKEND = "inline"
+BACKENDS = (THREAD_BACKEND, PROCESS_BACKEND, INLINE_BACKEND)
+
+
+class InlineExecutor(Executor):
+    def __init__(self, initializer: Callable = None,
+                 initargs: Tuple = ()) -> None:
+        """Executor running the tasks in the calling thread on submission.
+
+        :param initializer: Called once on creation, as for other executors.
+        :param initargs: The arguments given to the initializer.
+        """
+        super().__init__()
+        if initializer is not None:
+            initializer(*initargs)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exception:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+        return future
+
+
+def create_executor(backend: str, worker_amount: int,
+                    initializer: Callable = None,
+                    initargs: Tuple = ()) -> Executor:
+    """Create a new executor for the given backend.
+
+    :param backend: One of the BACKENDS.
+    :param worker_amount: The amount of workers, ignored for inline.
+    :param initializer: Called once at the start of each worker.
+    :param initargs: The arguments given to the initializer.
+    :return: The new executor.
+    :raises ValueError: If the backend is unknown.
+    """
+    if backend == THREAD_BACKEND:
+        return ThreadPoolExecutor(max_workers=worker_amount,
+                                  initializer=initializer, initargs=initargs)
+    if backend == PROCESS_BACKEND:
+        return ProcessPoolExecutor(max_workers=worker_amount,
+                                   initializer=initializer, initargs=initargs)
+    if backend == INLINE_BACKEND:
+        return InlineExecutor(initializer=initializer, initargs=initargs)
+    raise ValueError(f"Unknown executor backend {backend}, "
+                     f"expected one of {BACKENDS}")
+
+
+def estimate_size(result: Any) -> int:
+    """Estimate the memory used by a task result, without recursing
+    further than the items of a list.
+
+    :param result: The result to estimate.
+    :return: The estimated size in bytes.
+    """
+    size = sys.getsizeof(result)
+    if isinstance(result, list):
+        size += sum(sys.getsizeof(item) for item in result)
+    return size
+
+
+class PendingWindow:
+    def __init__(self, max_pending: int = None, max_bytes: int = None,
+                 sizeof: Callable[[Any], int] = estimate_size) -> None:
+        """Bound the amount of tasks submitted but not yet consumed.
+
+        :param max_pending: The maximal amount of pending tasks,
+        unbounded if None.
+        :param max_bytes: The maximal estimated size of the finished but
+        unconsumed results, unbounded if None.
+        :param sizeof: The function estimating the size of a result.
+        """
+        super().__init__()
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._sizes: Dict[Future, int] = {}
+        self._released: Set[Future] = set()
+        self._finished_bytes = 0
+
+    def bounded(self, futures: Iterable[Future]) \
+            -> Generator[Future, None, None]:
+        """Consume lazily submitted futures, in order, within the window.
+
+        The next future is only pulled, thus its task submitted, when the
+        window has room for it. Until then, the oldest pending futures are
+        yielded to the consumer.
+
+        :param futures: A lazy iterable submitting a task on each iteration.
+        :return: A Generator with the same futures, in the same order.
+        """
+        pending = deque()
+        for future in futures:
+            pending.append(future)
+            if self.max_bytes is not None:
+                future.add_done_callback(self._on_finished)
+            while pending and self._is_full(len(pending)):
+                yield self._release(pending.popleft())
+
+        while pending:
+            yield self._release(pending.popleft())
+
+    def _is_full(self, pending_amount: int) -> bool:
+        if self.max_pending is not None and \
+                pending_amount >= self.max_pending:
+            return True
+        with self._lock:
+            return self.max_bytes is not None and \
+                self._finished_bytes >= self.max_bytes
+
+    def _on_finished(self, future: Future) -> None:
+        with self._lock:
+            if future in self._released:
+                # Already given to the consumer, nothing left to account.
+                self._released.remove(future)
+            else:
+                size = 0
+                if not future.cancelled() and future.exception() is None:
+                    size = self.sizeof(future.result())
+                self._sizes[future] = size
+                self._finished_bytes += size
+
+    def _release(self, future: Future) -> Future:
+        if self.max_bytes is None:
+            return future
+        with self._lock:
+            if future in self._sizes:
+                self._finished_bytes -= self._sizes.pop(future)
+            else:
+                self._released.add(future)
+        return future
@@ -0,0 +1,214 @@
+"""
+This module defines the index-backed matching mode.
+
+Most criteria are equality checks on the normalized fields. Instead of
+evaluating them on each pair of companies, we index one data source on
+those fields and look up the matching companies for each company of the
+other data source.
+
+The NameContainedCriterion is not an equality, its companies are looked up
+from a substring index instead.
+"""
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Union
+
+from sharework.matching.criterion import (
+    CompanyCriterion,
+    NameContainedCriterion
+)
+from sharework.matching.matcher import CompanyMatcher, RowMatcher
+from sharework.matching.model import CompanyMatch, NormalizedCompany
+
+logger = logging.getLogger()
+
+
+class EqualityIndex:
+    def __init__(self, keys: Iterable[Optional[Hashable]]) -> None:
+        """Inverted index from a key to the position of the companies
+        holding it.
+
+        :param keys: The key of each company, None if it can't be matched.
+        """
+        super().__init__()
+        positions = defaultdict(list)
+        for position, key in enumerate(keys):
+            if key is not None:
+                positions[key].append(position)
+        self.positions: Dict[Hashable, List[int]] = dict(positions)
+
+    def lookup(self, key: Optional[Hashable]) -> List[int]:
+        """Retrieve the position of all companies holding the given key.
+
+        :param key: The key to look for.
+        :return: The list of positions, empty if the key is None or unknown.
+        """
+        if key is None:
+            return []
+        return self.positions.get(key, [])
+
+
+class SubstringIndex:
+    def __init__(self, values: Iterable[Optional[str]],
+                 gram_size: int = 3) -> None:
+        """Index of strings to find the ones containing, or contained in,
+        a given string.
+
+        - The strings containing the value are looked up from an n-gram
+        index, then verified.
+        - The strings contained in the value are looked up by enumerating the
+        substrings of the value with the length of an indexed string.
+
+        :param values: The string of each company, None if it can't be matched.
+        :param gram_size: The size of the n-grams in the index.
+        """
+        super().__init__()
+        self.gram_size = gram_size
+        positions = defaultdict(list)
+        for position, value in enumerate(values):
+            if value is not None:
+                positions[value].append(position)
+        self.positions: Dict[str, List[int]] = dict(positions)
+        self.lengths = sorted({len(value) for value in self.positions})
+
+        grams = defaultdict(set)
+        for value in self.positions:
+            for gram in self._grams(value):
+                grams[gram].add(value)
+        self.grams: Dict[str, Set[str]] = dict(grams)
+
+    def _grams(self, value: str) -> Set[str]:
+        return {value[start:start + self.gram_size]
+                for start in range(len(value) - self.gram_size + 1)}
+
+    def lookup(self, value: Optional[str]) -> Set[int]:
+        """Retrieve the position of all companies whose string contains the
+        given value or is contained in it.
+
+        :param value: The string to look for.
+        :return: The set of positions, empty if the value is None.
+        """
+        if value is None:
+            return set()
+
+        found = set()
+        for length in self.lengths:
+            if length > len(value):
+                break
+            for start in range(len(value) - length + 1):
+                if value[start:start + length] in self.positions:
+                    found.add(value[start:start + length])
+
+        if len(value) < self.gram_size:
+            containing = self.positions.keys()
+        else:
+            postings = sorted((self.grams.get(gram, set())
+                               for gram in self._grams(value)), key=len)
+            containing = set.intersection(*postings)
+        found.update(other for other in containing if value in other)
+
+        return {position for other in found
+                for position in self.positions[other]}
+
+
+def build_index(criterion: CompanyCriterion, features: List[Any]) \
+        -> Optional[Union[EqualityIndex, SubstringIndex]]:
+    """Build the index of a criterion over the prepared values of a source.
+
+    :param criterion: The criterion to index.
+    :param features: The prepared value of the criterion for each company.
+    :return: The index, None if the criterion can't be indexed.
+    """
+    if criterion.indexable:
+        return EqualityIndex(criterion.index_key(feature)
+                             for feature in features)
+    if isinstance(criterion, NameContainedCriterion):
+        return SubstringIndex(features)
+    return None
+
+
+def lookup_index(criterion: CompanyCriterion,
+                 index: Union[EqualityIndex, SubstringIndex],
+                 feature: Any) -> Iterable[int]:
+    """Retrieve the position of the companies matching the prepared value
+    of the criterion from its index.
+
+    :param criterion: The indexed criterion.
+    :param index: The index built by build_index.
+    :param feature: The prepared value to look for.
+    :return: The positions of the matching companies.
+    """
+    if isinstance(index, EqualityIndex):
+        return index.lookup(criterion.index_key(feature))
+    return index.lookup(feature)
+
+
+class IndexedMatcher(RowMatcher):
+    def __init__(self, matcher: CompanyMatcher,
+                 companies: List[NormalizedCompany]) -> None:
+        """Match companies against a source indexed on the equality criteria.
+
+        For each company, the companies of the indexed source satisfying each
+        equality criterion, or the name containment, are looked up, and the
+        weights are summed on them. The criteria that can't be indexed are
+        still evaluated on all pairs.
+
+        :param matcher: The matcher defining the criteria and strictness.
+        :param companies: The normalized companies to index.
+        """
+        super().__init__(matcher, companies)
+        self.indexes: Dict[int, Union[EqualityIndex, SubstringIndex]] = {}
+        for position, criterion in enumerate(matcher.criteria):
+            index = build_index(criterion, [company.features[position]
+                                            for company in companies])
+            if index is not None:
+                self.indexes[position] = index
+        logger.debug(f"Indexed {len(companies)} companies "
+                     f"on {len(self.indexes)} criteria")
+
+    def match_row(self, one: NormalizedCompany) -> List[CompanyMatch]:
+        criteria = self.matcher.criteria
+        successes = defaultdict(list)
+        for position, criterion in enumerate(criteria):
+            feature = one.features[position]
+            index = self.indexes.get(position)
+            if index is not None:
+                matching = lookup_index(criterion, index, feature)
+            else:
+                matching = [
+                    other for other, company in enumerate(self.companies)
+                    if criterion.compare_prepared(
+                        feature, company.features[position]
+                    )
+                ]
+            for other in matching:
+                successes[other].append(position)
+
+        matches = []
+        for other in sorted(successes):
+            two = self.companies[other]
+            succeeded = successes[other]
+            current_score = sum(criteria[position].weight
+                                for position in succeeded)
+
+            if self.matcher.strict:
+                total_weight = self.total_weight
+            else:
+                total_weight = sum(
+                    criterion.weight
+                    for position, criterion in enumerate(criteria)
+                    if position in succeeded or criterion.compare_prepared(
+                        one.features[position], two.features[position]
+                    ) is not None
+                )
+
+            score = current_score / total_weight
+            if self.matcher.threshold is not None and \
+                    score < self.matcher.threshold:
+                continue
+
+            matches.append(CompanyMatch(
+                one.company, two.company, score,
+                sum(1 << position for position in succeeded)
+            ))
+        return matches
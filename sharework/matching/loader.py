@@ -1,17 +1,25 @@
 """
 This module defines the ways of loading data.
 """
+import hashlib
 import logging
 import os
+import re
+import shutil
 import sqlite3
+import tempfile
 from abc import ABC
+from contextlib import closing
 from csv import DictReader
-from typing import Generator
+from typing import Generator, List, Optional, Sequence, Tuple
 
-from sharework.matching.model import Company
+from sharework.matching.model import Company, CompanyStore
 
 logger = logging.getLogger()
 
+# The name of a snapshot, the sha1 of the version of its source.
+SNAPSHOT_NAME = re.compile("[0-9a-f]{40}")
+
 
 class DataLoader(ABC):
 
@@ -22,6 +30,14 @@ class DataLoader(ABC):
         """
         raise NotImplementedError
 
+    def version(self) -> Optional[str]:
+        """Identify the current content of the source, changing whenever
+        the loaded companies change.
+
+        :return: The version of the content, None if unknown.
+        """
+        return None
+
 
 class CSVDataLoader(DataLoader):
     FIELDS = [
@@ -51,34 +67,168 @@ class CSVDataLoader(DataLoader):
                 line.update({"source_name": source})
                 yield Company(**line)
 
+    def version(self) -> Optional[str]:
+        stat = os.stat(self.path)
+        return f"csv:{os.path.abspath(self.path)}:{self.shorten}:" \
+               f"{stat.st_size}:{stat.st_mtime_ns}"
+
 
 class SQLiteDataLoader(DataLoader):
-    def __init__(self, db_path: str, source_name: str) -> None:
+    COLUMNS = [
+        "source_id", "source_name", "name", "website", "email",
+        "phone", "address", "postal_code", "city", "country"
+    ]
+
+    def __init__(self, db_path: str, source_name: str,
+                 chunk_size: int = None, version: str = None) -> None:
         """Load all data from a SQLite database,
         with the source matching the given name.
 
+        The content of a source can't be versioned cheaply: the file of the
+        database also changes when the matches are written in it, and
+        reading all rows costs as much as loading them. The source can thus
+        only be snapshotted with a version given by the caller.
+
         :param db_path: Path of the sqlite file.
         :param source_name: Name of the source to query.
+        :param chunk_size: Stream the results by chunks of this amount of
+        rows if given, fetch all of them at once otherwise.
+        :param version: The version of the companies of the source, which
+        must change with them, unknown if None.
         """
         super().__init__()
         self.db_path = db_path
         self.source_name = source_name
+        self.chunk_size = chunk_size
+        self._version = version
 
     def load(self) -> Generator[Company, None, None]:
-        sql = "SELECT * FROM companies WHERE source_name = ?"
-        with self.new_connection() as connection:
-            # Unfortunately, streaming the results will keep the connection
-            # open, thus locking the database with SQLite. Hence 'fetchall'
-            # This could behave better on other DBMS.
-            result = connection.execute(sql, (self.source_name,)).fetchall()
-
-        for row in result:
-            # Skip id on the Company constructor.
-            # This works because the constructor has the same order as the
-            # table. this is quite a weak binding and may be better with a
-            # strong naming in the retrieved values.
-            yield Company(*row[1:])
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM companies " \
+              f"WHERE source_name = ? ORDER BY id"
+        with closing(self.new_connection()) as connection:
+            if self.chunk_size is None:
+                # Streaming the results keeps a read transaction open,
+                # which blocks the writers unless the database is in WAL
+                # mode. Hence 'fetchall' by default.
+                rows = connection.execute(sql, (self.source_name,)).fetchall()
+                yield from self._companies(rows)
+                return
+
+            # All chunks are read from the same snapshot of the database.
+            # In WAL mode, the writers can commit in the meantime.
+            connection.execute("BEGIN")
+            try:
+                cursor = connection.execute(sql, (self.source_name,))
+                rows = cursor.fetchmany(self.chunk_size)
+                while rows:
+                    yield from self._companies(rows)
+                    rows = cursor.fetchmany(self.chunk_size)
+            finally:
+                connection.execute("COMMIT")
+
+    def version(self) -> Optional[str]:
+        if self._version is None:
+            return None
+        return f"sqlite:{os.path.abspath(self.db_path)}:" \
+               f"{self.source_name}:{self._version}"
+
+    def _companies(self, rows: List[Tuple]) -> Generator[Company, None, None]:
+        for row in rows:
+            yield Company(**dict(zip(self.COLUMNS, row)))
 
     def new_connection(self) -> sqlite3.Connection:
         return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
                                isolation_level=None)
+
+
+class MaterializedDataLoader(DataLoader):
+    def __init__(self, source: DataLoader, compact: bool = False) -> None:
+        """Load the companies of another source once and keep them in
+        memory, so that they can be loaded again without any I/O.
+
+        :param source: The source to materialize, loaded on first use.
+        :param compact: Keep the companies in a CompanyStore, using less
+        memory but creating new Company instances on each load.
+        """
+        super().__init__()
+        self.source = source
+        self.compact = compact
+        self._companies: Optional[Sequence[Company]] = None
+
+    @property
+    def companies(self) -> Sequence[Company]:
+        """The companies of the source, in loading order."""
+        if self._companies is None:
+            if self.compact:
+                self._companies = CompanyStore(self.source.load())
+            else:
+                self._companies = tuple(self.source.load())
+            logger.debug(f"Materialized {len(self._companies)} companies")
+        return self._companies
+
+    def load(self) -> Generator[Company, None, None]:
+        yield from self.companies
+
+    def version(self) -> Optional[str]:
+        return self.source.version()
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+
+class SnapshotDataLoader(DataLoader):
+    def __init__(self, source: DataLoader, cache_dir: str) -> None:
+        """Load the companies of another source from an on-disk snapshot,
+        written on the first load of each version of the source.
+
+        The snapshot is a CompanyStore, memory-mapped instead of parsed.
+        The source is always loaded directly if it has no version.
+
+        :param source: The source to snapshot.
+        :param cache_dir: The directory containing the snapshots of this
+        source only, the previous ones being removed on each new version.
+        """
+        super().__init__()
+        self.source = source
+        self.cache_dir = cache_dir
+
+    def load(self) -> Generator[Company, None, None]:
+        version = self.source.version()
+        if version is None:
+            yield from self.source.load()
+            return
+
+        key = hashlib.sha1(version.encode()).hexdigest()
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(path):
+            self._write_snapshot(path)
+        else:
+            logger.debug(f"Loading snapshot {path}")
+        yield from CompanyStore.open(path)
+
+    def _write_snapshot(self, path: str) -> None:
+        logger.info(f"Writing snapshot {path}")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written aside then renamed, so that a snapshot is always complete.
+        staging = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            CompanyStore(self.source.load()).save(staging)
+            os.replace(staging, path)
+        except OSError:
+            if not os.path.exists(path):
+                raise
+            # Written by a concurrent load meanwhile.
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._remove_previous_snapshots(path)
+
+    def _remove_previous_snapshots(self, path: str) -> None:
+        for name in os.listdir(self.cache_dir):
+            previous = os.path.join(self.cache_dir, name)
+            # The staging directories of concurrent loads are kept.
+            if previous != path and SNAPSHOT_NAME.fullmatch(name):
+                logger.info(f"Removing snapshot {previous}")
+                shutil.rmtree(previous, ignore_errors=True)
+
+    def version(self) -> Optional[str]:
+        return self.source.version()
@@ -4,21 +4,30 @@ This module defines the matcher algorithm and imports all needed criterion.
 # TODO: We may want to have an external criterion config. with weight.
 """
 import logging
+from abc import ABC
 from concurrent.futures import Future
-from concurrent.futures.thread import ThreadPoolExecutor
-from typing import Generator, List
+from typing import Generator, Iterable, List, Optional, Type
 
+from sharework.matching.blocking import Blocker
 from sharework.matching.criterion import (
     AddressCriterion, CompanyCriterion,
     DomainNameCriterion, FieldCriterion, NameContainedCriterion, PhoneCriterion
 )
-from sharework.matching.loader import DataLoader
-from sharework.matching.model import Company, CompanyMatch
+from sharework.matching.executor import (
+    PROCESS_BACKEND, PendingWindow,
+    THREAD_BACKEND, create_executor
+)
+from sharework.matching.loader import DataLoader, MaterializedDataLoader
+from sharework.matching.model import (
+    Company, CompanyMatch, NormalizedCompany, decode_criteria
+)
 
 logger = logging.getLogger()
 
 
 class CompanyMatcher:
+    # The position of a criterion is its bit in the persisted
+    # success_criteria, only append new criteria at the end.
     DEFAULT_CRITERIA = [
         DomainNameCriterion(5),
         FieldCriterion("name", 5),
@@ -28,7 +37,7 @@ class CompanyMatcher:
     ]
 
     def __init__(self, criteria: List[CompanyCriterion] = None,
-                 strict: bool = True) -> None:
+                 strict: bool = True, threshold: float = None) -> None:
         """Define the percentage of match between two companies.
 
         The matcher algorithm is a weighted percentage of success
@@ -46,35 +55,190 @@ class CompanyMatcher:
         :param strict: We want a strict match on all fields. If True,
         the weight of criterion with missing data is still added to the total
         weight, thus making it harder to match companies when missing data.
+        :param threshold: The minimal score of a match. If given, the criteria
+        are evaluated by decreasing weight per cost, and the evaluation stops
+        as soon as the remaining criteria can't reach the threshold anymore.
         """
         super().__init__()
         if not criteria:
             criteria = self.DEFAULT_CRITERIA
         self.criteria = criteria
         self.strict = strict
+        self.threshold = threshold
+        self._total_weight = sum(criterion.weight for criterion in criteria)
+        self._evaluation_order = sorted(
+            range(len(criteria)),
+            key=lambda position: -criteria[position].weight
+            / criteria[position].cost
+        )
 
-    def match(self, one: Company, two: Company) -> CompanyMatch:
+    def match(self, one: Company, two: Company) -> Optional[CompanyMatch]:
         """Compute if two company seems to be the same.
 
         :param one: The first company to match.
         :param two: The second company to match.
-        :return: The rate of matching between two companies from 0 to 1.
+        :return: The rate of matching between two companies from 0 to 1,
+        None if a threshold is defined and not reached.
         """
         logger.debug(f"Comparing {one.name} with {two.name}")
+        return self.match_prepared(self.prepare(one), self.prepare(two))
+
+    def prepare(self, company: Company) -> NormalizedCompany:
+        """Normalize once all fields of the company used by the criteria.
+
+        :param company: The company to normalize.
+        :return: The company along with its prepared criteria values.
+        """
+        return NormalizedCompany(company, tuple(
+            criterion.prepare(company) for criterion in self.criteria
+        ))
+
+    def match_prepared(self, one: NormalizedCompany,
+                       two: NormalizedCompany) -> Optional[CompanyMatch]:
+        """Compute if two normalized company seems to be the same.
+
+        :param one: The first normalized company to match.
+        :param two: The second normalized company to match.
+        :return: The rate of matching between two companies from 0 to 1,
+        None if a threshold is defined and not reached.
+        """
+        if self.threshold is None:
+            order = range(len(self.criteria))
+        else:
+            order = self._evaluation_order
 
         total_weight = 0
         current_score = 0
-        successes = []
-        for criterion in self.criteria:
-            match = criterion.match(one, two)
+        remaining_weight = self._total_weight
+        succeeded = 0
+        for position in order:
+            criterion = self.criteria[position]
+            match = criterion.compare_prepared(one.features[position],
+                                               two.features[position])
+            remaining_weight -= criterion.weight
             if self.strict or match is not None:
                 total_weight += criterion.weight
 
             if match:
                 current_score += criterion.weight
-                successes.append(criterion.name)
+                succeeded |= 1 << position
+
+            if self.threshold is not None and not self._can_reach(
+                    current_score, total_weight, remaining_weight):
+                return None
+
+        return CompanyMatch(one.company, two.company,
+                            current_score / total_weight, succeeded)
+
+    def decode_criteria(self, mask: int) -> List[str]:
+        """Decode the success_criteria bitmask of a match of this matcher.
+
+        :param mask: The bitmask of the successful criteria.
+        :return: The names of the successful criteria.
+        """
+        return decode_criteria(mask, [criterion.name
+                                      for criterion in self.criteria])
+
+    def _can_reach(self, current_score: int, total_weight: int,
+                   remaining_weight: int) -> bool:
+        """Tells if the threshold can still be reached. The best score is
+        obtained when all remaining criteria are successful, in both the
+        strict and not strict modes.
+        """
+        best_total = total_weight + remaining_weight
+        if not best_total:
+            return True
+        best_score = (current_score + remaining_weight) / best_total
+        return best_score >= self.threshold
+
+
+class RowMatcher(ABC):
+    def __init__(self, matcher: CompanyMatcher,
+                 companies: List[NormalizedCompany]) -> None:
+        """Match a company against all companies of a data source at once.
+
+        :param matcher: The matcher defining the criteria and strictness.
+        :param companies: The normalized companies to match against.
+        """
+        super().__init__()
+        self.matcher = matcher
+        self.companies = companies
+        self.total_weight = sum(criterion.weight
+                                for criterion in matcher.criteria)
+
+    def match_row(self, one: NormalizedCompany) -> List[CompanyMatch]:
+        """Compute the matches between the given company and all companies.
+
+        The matches have the same score as the CompanyMatcher, and the
+        threshold of the matcher is applied. The pairs without any
+        successful criterion, of a score of 0, may be left out by the
+        engines which don't evaluate every pair.
+
+        :param one: The normalized company to match.
+        :return: The list of CompanyMatch found.
+        """
+        raise NotImplementedError
+
+
+class PairwiseMatcher(RowMatcher):
+    """Evaluate the CompanyMatcher on each pair, returning all of them
+    unless the matcher defines a threshold."""
+
+    def match_row(self, one: NormalizedCompany) -> List[CompanyMatch]:
+        matches = (self.matcher.match_prepared(one, two)
+                   for two in self.companies)
+        return [match for match in matches if match is not None]
+
+
+class ChunkMatcher:
+    def __init__(self, engine: RowMatcher,
+                 companies: List[NormalizedCompany],
+                 threshold: float = None) -> None:
+        """Match ranges of companies with a RowMatcher engine.
+
+        :param engine: The engine holding the companies to match against.
+        :param companies: The normalized companies to match.
+        :param threshold: The minimal score of the returned matches,
+        return all matches if None.
+        """
+        super().__init__()
+        self.engine = engine
+        self.companies = companies
+        self.threshold = threshold
+
+    def match_chunk(self, start: int, stop: int) -> List[CompanyMatch]:
+        """Match the companies in the given range against all companies
+        of the engine.
+
+        :param start: Position of the first company to match.
+        :param stop: Position after the last company to match.
+        :return: The list of CompanyMatch found.
+        """
+        matches = []
+        for one in self.companies[start:stop]:
+            row = self.engine.match_row(one)
+            if self.threshold is not None:
+                row = [match for match in row if match.score >= self.threshold]
+            matches.extend(row)
+        return matches
+
+
+# The ChunkMatcher of the current worker process, set on its startup.
+_worker_chunk_matcher: Optional[ChunkMatcher] = None
 
-        return CompanyMatch(one, two, current_score / total_weight, successes)
+
+def _init_worker(engine: Type[RowMatcher], matcher: CompanyMatcher,
+                 companies_a: List[NormalizedCompany],
+                 companies_b: List[NormalizedCompany],
+                 threshold: Optional[float]) -> None:
+    """Receive both data sources once and build the engine in the worker."""
+    global _worker_chunk_matcher
+    _worker_chunk_matcher = ChunkMatcher(engine(matcher, companies_b),
+                                         companies_a, threshold)
+
+
+def _match_chunk_in_worker(start: int, stop: int) -> List[CompanyMatch]:
+    return _worker_chunk_matcher.match_chunk(start, stop)
 
 
 class SourcesMatcher:
@@ -82,29 +246,156 @@ class SourcesMatcher:
                  source_a: DataLoader,
                  source_b: DataLoader,
                  matcher: CompanyMatcher = None,
-                 worker_amount: int = 10) -> None:
+                 worker_amount: int = 10,
+                 blocker: Blocker = None,
+                 engine: Type[RowMatcher] = PairwiseMatcher,
+                 backend: str = THREAD_BACKEND,
+                 max_pending: int = None,
+                 max_pending_bytes: int = None) -> None:
         """
         Create matches between two companies data sources asynchronously.
 
         :param source_a: A generator of companies from the first data source
-        :param source_b: A generator of companies from the second data source
+        :param source_b: A generator of companies from the second data source,
+        materialized in memory on its first load.
+        :param blocker: The blocking stage restricting the compared pairs,
+        compare the full cartesian product if None.
+        :param engine: The RowMatcher used to compare a company with the
+        whole source B in compare_rows.
+        :param backend: The executor backend running the comparisons,
+        one of thread, process or inline.
+        :param max_pending: The maximal amount of tasks submitted but not
+        consumed yet, twice the amount of workers if None.
+        :param max_pending_bytes: The maximal estimated size of the results
+        finished but not consumed yet, unbounded if None.
         """
         super().__init__()
         self.source_a = source_a
+        if not isinstance(source_b, MaterializedDataLoader):
+            # The source B is loaded again by each comparison.
+            source_b = MaterializedDataLoader(source_b)
         self.source_b = source_b
-        self.pool = ThreadPoolExecutor(max_workers=worker_amount)
+        self.worker_amount = worker_amount
+        self.backend = backend
+        self.pool = create_executor(backend, worker_amount)
+        if max_pending is None:
+            max_pending = 2 * worker_amount
+        self.window = PendingWindow(max_pending, max_pending_bytes)
         self.matcher = CompanyMatcher() if matcher is None else matcher
+        self.blocker = blocker
+        self.engine = engine
 
     def compare(self) -> Generator[Future, None, None]:
         """Compare all data sources and returns the result as a list of
         futures CompanyMatch.
 
+        :return: A Generator containing Futures of CompanyMatch,
+        or of None if the matcher threshold is not reached.
+        """
+        yield from self.window.bounded(self._submit_pairs())
+
+    def _submit_pairs(self) -> Generator[Future, None, None]:
+        # Each company is normalized once, the source B is thus only
+        # loaded once and kept normalized in memory for the whole run.
+        companies_b = self._prepare(self.source_b.load())
+        if self.blocker is not None:
+            yield from self._compare_blocks(companies_b)
+            return
+
+        for company_a in self.source_a.load():
+            normalized_a = self.matcher.prepare(company_a)
+            for normalized_b in companies_b:
+                yield self.pool.submit(self.matcher.match_prepared,
+                                       normalized_a, normalized_b)
+
+    def compare_rows(self, chunk_size: int = 1, threshold: float = None) \
+            -> Generator[Future, None, None]:
+        """Compare chunks of companies of the source A with the whole
+        source B in a single task, using the RowMatcher engine.
+
+        With the process backend, both sources are sent once to each worker
+        and the tasks only hold the range of companies to compare.
+
+        :param chunk_size: The amount of companies of source A per task.
+        :param threshold: The minimal score of the returned matches,
+        filtered in the task to avoid moving the others around.
+        Defaults to the threshold of the matcher.
+        :return: A Generator containing Futures of List of CompanyMatch,
+        one per chunk of the source A.
+        """
+        if threshold is None:
+            threshold = self.matcher.threshold
+        yield from self.window.bounded(
+            self._submit_chunks(chunk_size, threshold)
+        )
+
+    def _submit_chunks(self, chunk_size: int, threshold: Optional[float]) \
+            -> Generator[Future, None, None]:
+        companies_a = self._prepare(self.source_a.load())
+        companies_b = self._prepare(self.source_b.load())
+
+        if self.backend == PROCESS_BACKEND:
+            self.pool.shutdown()
+            self.pool = create_executor(
+                self.backend, self.worker_amount,
+                initializer=_init_worker,
+                initargs=(self.engine, self.matcher,
+                          companies_a, companies_b, threshold)
+            )
+            task = _match_chunk_in_worker
+        else:
+            task = ChunkMatcher(self.engine(self.matcher, companies_b),
+                                companies_a, threshold).match_chunk
+
+        for start in range(0, len(companies_a), chunk_size):
+            yield self.pool.submit(task, start, start + chunk_size)
+
+    def _prepare(self, companies: Iterable[Company]) \
+            -> List[NormalizedCompany]:
+        return [self.matcher.prepare(company) for company in companies]
+
+    def _compare_blocks(self, companies_b: List[NormalizedCompany]) \
+            -> Generator[Future, None, None]:
+        """Compare only the pairs of companies sharing a block.
+
+        :param companies_b: The normalized companies of the source B.
         :return: A Generator containing Futures of CompanyMatch.
         """
+        self.blocker.index(normalized.company for normalized in companies_b)
+        stats = self.blocker.stats
+
         for company_a in self.source_a.load():
-            for company_b in self.source_b.load():
-                yield self.pool.submit(self.matcher.match,
-                                       company_a, company_b)
+            normalized_a = self.matcher.prepare(company_a)
+            candidates = self.blocker.candidates(company_a)
+            stats.total_pairs += len(companies_b)
+            stats.candidate_pairs += len(candidates)
+
+            if not self.blocker.strict:
+                for position in sorted(candidates):
+                    yield self.pool.submit(self.matcher.match_prepared,
+                                           normalized_a,
+                                           companies_b[position])
+                continue
+
+            for position, normalized_b in enumerate(companies_b):
+                if position in candidates:
+                    yield self.pool.submit(self.matcher.match_prepared,
+                                           normalized_a, normalized_b)
+                else:
+                    # Without any common block, the pair is not evaluated
+                    # and directly considered as not matching.
+                    match = CompanyMatch(company_a, normalized_b.company,
+                                         0.0, 0)
+                    threshold = self.matcher.threshold
+                    if threshold is not None and match.score < threshold:
+                        match = None
+                    future = Future()
+                    future.set_result(match)
+                    yield future
+
+        logger.info(f"Blocking submitted {stats.candidate_pairs} "
+                    f"out of {stats.total_pairs} pairs "
+                    f"(reduction ratio {stats.reduction_ratio:.4f})")
 
     def stop(self):
         """Stop the matcher and all associated operations."""
@@ -1,9 +1,20 @@
+import json
+import mmap
+import os
+from array import array
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+# The classes are slotted, without any per-instance __dict__, since
+# millions of them can be held at once.
 
 
 @dataclass
 class Company:
+    __slots__ = ("source_id", "source_name", "name", "website", "email",
+                 "phone", "address", "postal_code", "city", "country")
+
     source_id: int
     source_name: str
     name: str
@@ -18,7 +29,180 @@ class Company:
 
 @dataclass
 class CompanyMatch:
+    __slots__ = ("company_a", "company_b", "score", "success_criteria")
+
     company_a: Company
     company_b: Company
     score: float
-    success_criteria: List[str]
+    # Bitmask of the successful criteria, the bit of a criterion being its
+    # position in the matcher, see decode_criteria.
+    success_criteria: int
+
+
+@dataclass
+class NormalizedCompany:
+    __slots__ = ("company", "features")
+
+    company: Company
+    # The prepared value of each criterion, in the order of the matcher.
+    features: Tuple[Any, ...]
+
+
+def decode_criteria(mask: int, names: Sequence[str]) -> List[str]:
+    """Decode a success_criteria bitmask.
+
+    :param mask: The bitmask of the successful criteria.
+    :param names: The name of each criterion, in the order of the matcher.
+    :return: The names of the successful criteria, in the order of the matcher.
+    """
+    return [name for position, name in enumerate(names)
+            if mask >> position & 1]
+
+
+class _Column:
+    def __init__(self) -> None:
+        """Column of values encoded as codes in a table of the distinct
+        values. The distinct strings are concatenated in a single UTF-8
+        buffer, the other values are kept as-is.
+        """
+        super().__init__()
+        self.codes = array("q")
+        self.offsets = array("q", [0])
+        self.others: Dict[int, Any] = {}
+        self.buffer = bytearray()
+        # Only used to encode the values, dropped by freeze.
+        self._known: Dict[Tuple[type, Any], int] = {}
+
+    def append(self, value: Any) -> None:
+        key = (type(value), value)
+        code = self._known.get(key)
+        if code is None:
+            code = self._known[key] = len(self._known)
+            if isinstance(value, str):
+                self.buffer += value.encode()
+            else:
+                self.others[code] = value
+            self.offsets.append(len(self.buffer))
+        self.codes.append(code)
+
+    def freeze(self) -> None:
+        self._known = {}
+        self.buffer = bytes(self.buffer)
+
+    def save(self, prefix: str) -> List[Tuple[int, Any]]:
+        """Write the column in files starting with the given prefix.
+
+        :param prefix: The prefix of the files.
+        :return: The values which are not strings, by code.
+        """
+        for suffix, content in (("codes", self.codes),
+                                ("offsets", self.offsets),
+                                ("strings", self.buffer)):
+            with open(f"{prefix}.{suffix}", "wb") as column_file:
+                column_file.write(content)
+        return sorted(self.others.items())
+
+    @classmethod
+    def open(cls, prefix: str, others: List[Tuple[int, Any]]) -> '_Column':
+        """Open a column written by save, its files being memory-mapped.
+
+        :param prefix: The prefix of the files.
+        :param others: The values which are not strings, by code.
+        :return: The read-only column.
+        """
+        column = cls()
+        column.codes = _map(f"{prefix}.codes").cast("q")
+        column.offsets = _map(f"{prefix}.offsets").cast("q")
+        column.buffer = _map(f"{prefix}.strings")
+        column.others = dict(others)
+        return column
+
+    def __getitem__(self, position: int) -> Any:
+        code = self.codes[position]
+        if code in self.others:
+            return self.others[code]
+        return str(self.buffer[self.offsets[code]:self.offsets[code + 1]],
+                   "utf-8")
+
+    def values(self) -> List[Any]:
+        """Decode the whole column, each distinct value being decoded once
+        and shared by all its occurrences."""
+        table = [self.others[code] if code in self.others
+                 else str(self.buffer[start:stop], "utf-8")
+                 for code, (start, stop) in enumerate(zip(self.offsets,
+                                                          self.offsets[1:]))]
+        return [table[code] for code in self.codes]
+
+
+def _map(path: str) -> memoryview:
+    """Memory-map a whole file in read-only mode."""
+    with open(path, "rb") as mapped_file:
+        if not os.fstat(mapped_file.fileno()).st_size:
+            # Empty files can't be mapped.
+            return memoryview(b"")
+        return memoryview(mmap.mmap(mapped_file.fileno(), 0,
+                                    access=mmap.ACCESS_READ))
+
+
+class CompanyStore:
+    FIELDS = Company.__slots__
+
+    def __init__(self, companies: Iterable[Company]) -> None:
+        """Store companies by column, a company being a position in the
+        columns. Each distinct value of a column is only held once, the
+        strings being encoded in a single buffer.
+
+        A Company is created again on each access, the store being meant
+        to keep a large source in memory rather than to be read often.
+
+        :param companies: The companies to store.
+        """
+        super().__init__()
+        self.columns = {field: _Column() for field in self.FIELDS}
+        for company in companies:
+            for field, column in self.columns.items():
+                column.append(getattr(company, field))
+        for column in self.columns.values():
+            column.freeze()
+
+    def save(self, path: str) -> None:
+        """Write the store in a directory, to be opened again later.
+
+        :param path: Path to the directory, created if not existing.
+        """
+        os.makedirs(path, exist_ok=True)
+        others = {field: column.save(os.path.join(path, field))
+                  for field, column in self.columns.items()}
+        with open(os.path.join(path, "metadata.json"), "w") as metadata:
+            json.dump({"size": len(self), "others": others}, metadata)
+
+    @classmethod
+    def open(cls, path: str) -> 'CompanyStore':
+        """Open a store written by save, its columns being memory-mapped
+        instead of read.
+
+        :param path: Path to the directory.
+        :return: The read-only store.
+        """
+        with open(os.path.join(path, "metadata.json"), "r") as metadata:
+            others = json.load(metadata)["others"]
+        store = cls(())
+        store.columns = {
+            field: _Column.open(os.path.join(path, field), others[field])
+            for field in cls.FIELDS
+        }
+        return store
+
+    def __getitem__(self, position: int) -> Company:
+        if not -len(self) <= position < len(self):
+            raise IndexError(position)
+        return Company(*(self.columns[field][position]
+                         for field in self.FIELDS))
+
+    def __iter__(self) -> Iterator[Company]:
+        columns = [self.columns[field].values() for field in self.FIELDS]
+        for row in zip(*columns):
+            yield Company(*row)
+
+    def __len__(self) -> int:
+        return len(self.columns[self.FIELDS[0]].codes)
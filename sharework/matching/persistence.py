@@ -1,12 +1,18 @@
 """
 This module defines the ways of persisting data.
 """
+import bz2
+import csv
+import gzip
+import io
 import logging
+import lzma
 import os
+import queue
 import sqlite3
+import threading
 from abc import ABC
-from csv import DictWriter
-from typing import List
+from typing import List, Optional, Tuple
 
 from sharework import RESOURCES_DIR
 from sharework.matching.model import CompanyMatch
@@ -23,7 +29,8 @@ class DataDumper(ABC):
         raise NotImplementedError
 
     def add_all(self, data: List[CompanyMatch]) -> None:
-        """Add the List of CompanyMatch to the persistence.
+        """Add the List of CompanyMatch to the persistence, persisting them
+        at once.
 
         :param data: The list of CompanyMatch to add.
         """
@@ -34,6 +41,22 @@ class DataDumper(ABC):
         """
         raise NotImplementedError
 
+    def close(self) -> None:
+        """Persist all remaining data and release the persistence,
+        which can't be used afterwards. Only flushes by default.
+        """
+        self.flush()
+
+
+def _to_row(data: CompanyMatch) -> Tuple:
+    """Flatten a CompanyMatch to the persisted columns.
+    The criteria are persisted as their bitmask,
+    decoded with CompanyMatcher.decode_criteria.
+    """
+    return (data.company_a.source_name, data.company_a.source_id,
+            data.company_b.source_name, data.company_b.source_id,
+            data.score, data.success_criteria)
+
 
 class CSVDataDumper(DataDumper):
     FIELDS = [
@@ -41,95 +64,295 @@ class CSVDataDumper(DataDumper):
         "company_b_source", "company_b_id",
         "score", "criteria"
     ]
+    COMPRESSIONS = {
+        "gzip": gzip.open,
+        "bz2": bz2.open,
+        "lzma": lzma.open,
+    }
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, compression: str = None,
+                 buffer_size: int = 1024 * 1024) -> None:
         """Create a new output CSV to contain all matches.
 
+        The file is kept open until the dumper is closed, the matches being
+        streamed through a write buffer.
+
         :param path: Path to the CSV file to generate.
+        :param compression: Compress the file on the fly if given,
+        one of the COMPRESSIONS.
+        :param buffer_size: The size of the write buffer, in bytes.
+        :raises ValueError: If the compression is unknown.
         """
         super().__init__()
+        if compression is not None and compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression}, "
+                             f"expected one of {list(self.COMPRESSIONS)}")
         self.output_path = path
-        self.lines = []
+        self._file = open(path, "ab", buffering=buffer_size)
+        self._stream = self._file
+        if compression is not None:
+            self._stream = self.COMPRESSIONS[compression](self._file, "ab")
+        self._text = io.TextIOWrapper(self._stream, encoding="utf-8",
+                                      newline="")
+        self._writer = csv.writer(self._text)
         self._init_headers()
 
     def add(self, data: CompanyMatch) -> None:
-        self.lines.append({
-            "company_a_source": data.company_a.source_name,
-            "company_a_id": data.company_a.source_id,
-            "company_b_source": data.company_b.source_name,
-            "company_b_id": data.company_b.source_id,
-            "score": data.score,
-            "criteria": ';'.join(data.success_criteria),
-        })
-        # Avoid keeping an array growing too much in this class.
-        # This is a tradeoff between too much IOs and too much memory usage.
-        if len(self.lines) > 500:
-            logger.info("Flushing current lines...")
-            self.flush()
+        self._writer.writerow(_to_row(data))
 
     def add_all(self, data: List[CompanyMatch]) -> None:
-        map(self.add, data)
+        self._writer.writerows(map(_to_row, data))
 
     def flush(self) -> None:
-        self.__exec_in_writer(lambda writer: writer.writerows(self.lines))
-        self.lines.clear()
+        self._text.flush()
+
+    def close(self) -> None:
+        super().close()
+        if self._stream is not self._file:
+            # Write the end of the compressed stream, keeping the file open.
+            self._stream.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
 
     def _init_headers(self) -> None:
         """Add the headers to the output file, automatically called."""
-        self.__exec_in_writer(lambda writer: writer.writeheader())
-
-    def __exec_in_writer(self, operation) -> None:
-        with open(self.output_path, "a") as output_file:
-            writer = DictWriter(output_file, fieldnames=self.FIELDS)
-            operation(writer)
+        self._writer.writerow(self.FIELDS)
 
 
 class SqliteDataDumper(DataDumper):
+    INSERT = """INSERT INTO matches (
+        company_a_source, company_a_id,
+        company_b_source, company_b_id,
+        score, success_criteria
+    ) VALUES (?, ?, ?, ?, ?, ?)"""
+    # The matches table of the previous versions, storing the names of the
+    # successful criteria, is moved there until converted.
+    LEGACY_TABLE = "matches_legacy"
 
-    def __init__(self, db_path: str) -> None:
+    def __init__(self, db_path: str, batch_size: int = 10000,
+                 batch_bytes: int = None, criteria: List[str] = None) -> None:
         """Create a new output SQLite to contain all matches.
 
+        A single connection is kept open until the dumper is closed, with the
+        database in WAL mode so that readers are not blocked by the inserts.
+        Each batch of matches is inserted in its own transaction.
+
         :param db_path: Path to the sqlite database to use.
+        :param batch_size: The amount of matches inserted per transaction.
+        :param batch_bytes: The estimated size of the matches inserted per
+        transaction, unbounded if None.
+        :param criteria: The name of each criterion of the matcher, used to
+        convert the matches of the previous versions to bitmasks. They are
+        kept aside in the LEGACY_TABLE if not given.
         """
         super().__init__()
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.criteria = criteria
+        self.connection = self.new_connection()
         self._init_db()
         self.lines = []
+        self._lines_bytes = 0
 
     def _init_db(self) -> None:
         """Creates the requires db schema"""
+        # Only the last commits may be lost on a power failure in WAL mode
+        # with a NORMAL synchronization, never the database integrity.
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        columns = {column[1]: column[2] for column in self.connection.execute(
+            "PRAGMA table_info(matches)"
+        )}
+        if columns and columns.get("success_criteria") != "INTEGER":
+            logger.info(f"Moving the previous matches to {self.LEGACY_TABLE}")
+            self.connection.execute(
+                f"ALTER TABLE matches RENAME TO {self.LEGACY_TABLE}"
+            )
         path = os.path.join(RESOURCES_DIR, "sql", "0_init_matches_table.sql")
-        with self.new_connection() as connection:
-            with open(path, "r") as script:
-                content = script.read()
-                connection.executescript(content)
-            connection.commit()
+        with open(path, "r") as script:
+            self.connection.executescript(script.read())
+        self.connection.commit()
+        self._convert_legacy_matches()
+
+    def _convert_legacy_matches(self) -> None:
+        """Convert the matches of the LEGACY_TABLE, if any, to bitmasks
+        into the matches table, then drop the LEGACY_TABLE."""
+        if not self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = ?", (self.LEGACY_TABLE,)).fetchone():
+            return
+
+        values = [value for value, in self.connection.execute(
+            f"SELECT DISTINCT success_criteria FROM {self.LEGACY_TABLE}"
+        )]
+        masks = {value: _legacy_mask(value, self.criteria or [])
+                 for value in values}
+        unknown = [value for value, mask in masks.items() if mask is None]
+        if unknown:
+            logger.warning(f"The matches of {self.LEGACY_TABLE} are kept "
+                           f"aside, unknown criteria {unknown[:5]}")
+            return
+
+        self.connection.create_function("legacy_mask", 1, masks.get)
+        with self.connection:
+            self.connection.execute(
+                f"INSERT INTO matches (id, company_a_source, company_a_id, "
+                f"company_b_source, company_b_id, score, success_criteria) "
+                f"SELECT id, company_a_source, company_a_id, "
+                f"company_b_source, company_b_id, score, "
+                f"legacy_mask(success_criteria) FROM {self.LEGACY_TABLE}"
+            )
+            self.connection.execute(f"DROP TABLE {self.LEGACY_TABLE}")
+        logger.info("Converted the previous matches to bitmasks")
 
     def add(self, data: CompanyMatch) -> None:
-        # Not the best way of persisting the criteria, we could have a
-        # separate table for that.
-        self.lines.append((
-            data.company_a.source_name, data.company_a.source_id,
-            data.company_b.source_name, data.company_b.source_id,
-            data.score, ';'.join(data.success_criteria)
-        ))
-        if len(self.lines) > 500:
+        line = _to_row(data)
+        self.lines.append(line)
+        if self.batch_bytes is not None:
+            self._lines_bytes += sum(len(value) if isinstance(value, str)
+                                     else 8 for value in line)
+        if len(self.lines) >= self.batch_size or (
+                self.batch_bytes is not None
+                and self._lines_bytes >= self.batch_bytes):
             self.flush()
 
     def add_all(self, data: List[CompanyMatch]) -> None:
-        map(self.add, data)
+        # The matches added one by one are inserted first to keep the order.
+        with self.connection:
+            self.connection.executemany(self.INSERT, self.lines)
+            self.connection.executemany(self.INSERT, map(_to_row, data))
+        self.lines.clear()
+        self._lines_bytes = 0
 
     def flush(self) -> None:
-        sql = """INSERT INTO matches (
-            company_a_source, company_a_id,
-            company_b_source, company_b_id,
-            score, success_criteria
-        ) VALUES (?, ?, ?, ?, ?, ?)"""
-
-        with self.new_connection() as connection:
-            connection.executemany(sql, self.lines)
-            connection.commit()
+        with self.connection:
+            self.connection.executemany(self.INSERT, self.lines)
         self.lines.clear()
+        self._lines_bytes = 0
+
+    def close(self) -> None:
+        super().close()
+        # Copy the WAL to the database, syncing both on disk.
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.close()
 
     def new_connection(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_path)
+        # The connection may be handed over to a writer thread,
+        # while only being used by a single thread at a time.
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+
+def _legacy_mask(value: Optional[str], criteria: List[str]) -> Optional[int]:
+    """Convert the successful criteria of a match of the previous versions,
+    their names separated by semicolons, to a bitmask.
+
+    :param value: The persisted successful criteria.
+    :param criteria: The name of each criterion of the matcher.
+    :return: The bitmask, None if a criterion is not in the matcher.
+    """
+    if isinstance(value, int):
+        return value
+    if not value:
+        return 0
+    if value.isdigit():
+        # Written as text by a bitmask version in the previous table.
+        return int(value)
+
+    mask = 0
+    for name in value.split(";"):
+        positions = [position for position, criterion in enumerate(criteria)
+                     if criterion == name]
+        if not positions:
+            # The field criteria were once named after their class only.
+            positions = [position for position, criterion
+                         in enumerate(criteria)
+                         if criterion.split(":")[0] == name]
+        if len(positions) != 1:
+            return None
+        mask |= 1 << positions[0]
+    return mask
+
+
+class AsyncDataDumper(DataDumper):
+    # Markers sent to the writer thread along with the matches.
+    _FLUSH = object()
+    _CLOSE = object()
+
+    def __init__(self, dumper: DataDumper, max_queued: int = 10000) -> None:
+        """Persist the matches from a dedicated writer thread, so that
+        the persistence overlaps with the matching.
+
+        Once the writer thread fails, the following matches are dropped and
+        the failure is raised on each call.
+
+        :param dumper: The dumper persisting the matches, only used by the
+        writer thread once given.
+        :param max_queued: The maximal amount of calls waiting for the
+        writer thread, a call blocking when reached.
+        """
+        super().__init__()
+        self.dumper = dumper
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._writer = threading.Thread(target=self._write,
+                                        name="sharework-writer", daemon=True)
+        self._writer.start()
+
+    def add(self, data: CompanyMatch) -> None:
+        self._put(data)
+
+    def add_all(self, data: List[CompanyMatch]) -> None:
+        self._put(list(data))
+
+    def flush(self) -> None:
+        """Wait for the writer thread to persist all matches added so far,
+        then flush the dumper."""
+        self._put(self._FLUSH)
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Wait for the writer thread to persist all matches,
+        then close the dumper and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._CLOSE)
+        self._writer.join()
+        self._raise_error()
+
+    def _put(self, item) -> None:
+        if self._closed:
+            raise ValueError("The dumper is closed")
+        self._raise_error()
+        self._queue.put(item)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _write(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._CLOSE:
+                    self.dumper.close()
+                    return
+                if self._error is not None:
+                    # Keep consuming so that the producer is not blocked
+                    # until it gets the error.
+                    continue
+                if item is self._FLUSH:
+                    self.dumper.flush()
+                elif isinstance(item, list):
+                    self.dumper.add_all(item)
+                else:
+                    self.dumper.add(item)
+            except BaseException as error:
+                logger.exception("Failed to persist the matches")
+                self._error = error
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,199 @@
+"""
+This module defines the vectorized matching mode.
+
+The prepared value of each criterion is encoded as an integer code, so that
+a company is compared with a whole data source at once using NumPy arrays.
+
+NumPy is an optional dependency, available through the 'vectorized' extra.
+"""
+import logging
+from typing import Any, Dict, Hashable, List, Tuple
+
+from sharework.matching.criterion import AddressCriterion, CompanyCriterion
+from sharework.matching.index import SubstringIndex, build_index
+from sharework.matching.matcher import CompanyMatcher, RowMatcher
+from sharework.matching.model import CompanyMatch, NormalizedCompany
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger()
+
+# Code of the missing values in the indexed source.
+MISSING_CODE = -1
+# Code of a value that does not exist in the indexed source.
+UNKNOWN_CODE = -2
+
+
+class _Column:
+    def compare(self, feature: Any) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Compare the prepared value with all values of the column.
+
+        :param feature: The prepared value to compare.
+        :return: The success and defined masks, the latter being False where
+        the criterion returns None.
+        """
+        raise NotImplementedError
+
+
+class _CodeColumn(_Column):
+    def __init__(self, criterion: CompanyCriterion,
+                 features: List[Any]) -> None:
+        """Encode the index keys of an indexable criterion."""
+        super().__init__()
+        self.criterion = criterion
+        self.vocabulary: Dict[Hashable, int] = {}
+        self.codes = np.fromiter(
+            (self._encode(criterion.index_key(feature))
+             for feature in features),
+            dtype=np.int64, count=len(features)
+        )
+        self.present = self.codes != MISSING_CODE
+        self.absent = np.zeros(len(features), dtype=bool)
+
+    def _encode(self, key: Hashable) -> int:
+        if key is None:
+            return MISSING_CODE
+        return self.vocabulary.setdefault(key, len(self.vocabulary))
+
+    def compare(self, feature: Any) -> Tuple['np.ndarray', 'np.ndarray']:
+        key = self.criterion.index_key(feature)
+        if key is None:
+            return self.absent, self.absent
+        code = self.vocabulary.get(key, UNKNOWN_CODE)
+        return self.codes == code, self.present
+
+
+class _CompositeColumn(_Column):
+    def __init__(self, criterion: AddressCriterion,
+                 features: List[Tuple[Any, ...]]) -> None:
+        """Encode each sub-criterion of an AddressCriterion."""
+        super().__init__()
+        self.columns = [
+            _CodeColumn(sub_criterion, [feature[position]
+                                        for feature in features])
+            for position, sub_criterion in enumerate(criterion.criteria)
+        ]
+        self.size = len(features)
+
+    def compare(self, feature: Tuple[Any, ...]) \
+            -> Tuple['np.ndarray', 'np.ndarray']:
+        # The AddressCriterion returns the result of the first sub-criterion
+        # which is not successful, so it is None if this one is None.
+        success = np.ones(self.size, dtype=bool)
+        undefined = np.zeros(self.size, dtype=bool)
+        for column, sub_feature in zip(self.columns, feature):
+            sub_success, sub_defined = column.compare(sub_feature)
+            undefined |= success & ~sub_defined
+            success &= sub_success
+        return success, ~undefined
+
+
+class _SubstringColumn(_Column):
+    def __init__(self, index: SubstringIndex, features: List[Any]) -> None:
+        """Look up the NameContainedCriterion matches from its index."""
+        super().__init__()
+        self.index = index
+        self.present = np.fromiter((feature is not None
+                                    for feature in features),
+                                   dtype=bool, count=len(features))
+        self.absent = np.zeros(len(features), dtype=bool)
+
+    def compare(self, feature: Any) -> Tuple['np.ndarray', 'np.ndarray']:
+        if feature is None:
+            return self.absent, self.absent
+        success = np.zeros(len(self.present), dtype=bool)
+        success[list(self.index.lookup(feature))] = True
+        return success, self.present
+
+
+class _PairwiseColumn(_Column):
+    def __init__(self, criterion: CompanyCriterion,
+                 features: List[Any]) -> None:
+        """Fallback evaluating the criterion on each value."""
+        super().__init__()
+        self.criterion = criterion
+        self.features = features
+
+    def compare(self, feature: Any) -> Tuple['np.ndarray', 'np.ndarray']:
+        results = [self.criterion.compare_prepared(feature, other)
+                   for other in self.features]
+        success = np.fromiter((bool(result) for result in results),
+                              dtype=bool, count=len(results))
+        defined = np.fromiter((result is not None for result in results),
+                              dtype=bool, count=len(results))
+        return success, defined
+
+
+class VectorizedMatcher(RowMatcher):
+    def __init__(self, matcher: CompanyMatcher,
+                 companies: List[NormalizedCompany]) -> None:
+        """Match companies against a source encoded in NumPy arrays.
+
+        The indexable criteria are encoded as integer codes, one column per
+        criterion, and compared with the whole source at once. The name
+        containment is looked up from a substring index, and the other
+        criteria are still evaluated on all pairs.
+
+        :param matcher: The matcher defining the criteria and strictness.
+        :param companies: The normalized companies to encode.
+        :raises ImportError: If NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("The vectorized engine requires numpy, "
+                              "install the 'vectorized' extra")
+        super().__init__(matcher, companies)
+        self.weights = np.array([criterion.weight
+                                 for criterion in matcher.criteria],
+                                dtype=np.int64)
+        self.bits = np.array([1 << position
+                              for position in range(len(matcher.criteria))],
+                             dtype=np.int64)
+        self.columns: List[_Column] = []
+        for position, criterion in enumerate(matcher.criteria):
+            features = [company.features[position] for company in companies]
+            if isinstance(criterion, AddressCriterion) and \
+                    criterion.indexable:
+                column = _CompositeColumn(criterion, features)
+            elif criterion.indexable:
+                column = _CodeColumn(criterion, features)
+            else:
+                index = build_index(criterion, features)
+                if isinstance(index, SubstringIndex):
+                    column = _SubstringColumn(index, features)
+                else:
+                    column = _PairwiseColumn(criterion, features)
+            self.columns.append(column)
+        logger.debug(f"Encoded {len(companies)} companies "
+                     f"on {len(self.columns)} criteria")
+
+    def match_row(self, one: NormalizedCompany) -> List[CompanyMatch]:
+        shape = (len(self.columns), len(self.companies))
+        success = np.empty(shape, dtype=bool)
+        defined = np.empty(shape, dtype=bool)
+        for position, column in enumerate(self.columns):
+            success[position], defined[position] = \
+                column.compare(one.features[position])
+
+        current_score = self.weights @ success
+        if self.matcher.strict:
+            total_weight = np.full(len(self.companies), self.total_weight)
+        else:
+            total_weight = self.weights @ defined
+
+        selected = current_score > 0
+        scores = np.zeros(len(self.companies))
+        np.divide(current_score, total_weight, out=scores, where=selected)
+        if self.matcher.threshold is not None:
+            selected &= scores >= self.matcher.threshold
+
+        masks = self.bits @ success
+        matches = []
+        for other in np.flatnonzero(selected):
+            matches.append(CompanyMatch(
+                one.company, self.companies[other].company,
+                float(scores[other]), int(masks[other])
+            ))
+        return matches
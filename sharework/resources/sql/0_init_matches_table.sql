@@ -5,5 +5,5 @@ CREATE TABLE IF NOT EXISTS matches (
     company_b_source   VARCHAR (64),
     company_b_id       INTEGER,
     score              FLOAT,
-    success_criteria   VARCHAR (512)
+    success_criteria   INTEGER
 );
\ No newline at end of file
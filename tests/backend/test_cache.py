@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import patch
+
+from sharework.backend.cache import ResponseCache, compute_etag
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = ResponseCache(max_size=2, ttl=10)
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("a"))
+        cached = self.cache.put("a", {"id": 1}, {"X-Next-Cursor": "c"}, [1])
+
+        self.assertIs(cached, self.cache.get("a"))
+        self.assertEqual({"id": 1}, cached.body)
+        self.assertEqual({"X-Next-Cursor": "c"}, cached.headers)
+        self.assertEqual(compute_etag({"id": 1}), cached.etag)
+
+    def test_etag(self):
+        self.assertEqual(compute_etag({"id": 1, "name": "A"}),
+                         compute_etag({"name": "A", "id": 1}))
+        self.assertNotEqual(compute_etag({"id": 1}), compute_etag({"id": 2}))
+
+    def test_least_recently_used_evicted(self):
+        self.cache.put("a", {}, {}, [])
+        self.cache.put("b", {}, {}, [])
+        self.cache.get("a")
+        self.cache.put("c", {}, {}, [])
+
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+
+    @patch('sharework.backend.cache.time.monotonic')
+    def test_expired(self, monotonic_mock):
+        monotonic_mock.return_value = 100
+        self.cache.put("a", {}, {}, [])
+
+        monotonic_mock.return_value = 109
+        self.assertIsNotNone(self.cache.get("a"))
+        monotonic_mock.return_value = 110
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(0, len(self.cache))
+
+    def test_invalidate(self):
+        self.cache.put("a", [{"id": 1}, {"id": 2}], {}, [1, 2])
+        self.cache.put("b", {"id": 3}, {}, [3])
+
+        self.cache.invalidate([2, 4])
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("b"))
+
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
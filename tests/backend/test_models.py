@@ -3,6 +3,9 @@ import sqlite3
 import unittest
 from datetime import datetime
 
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
 from sharework.backend.models import Base, Company, Match
 from tests import RESOURCES_DIR
 
@@ -25,6 +28,32 @@ class ModelTestCase(unittest.TestCase):
     def tearDown(self) -> None:
         super().tearDown()
         os.remove(self.db_file)
+        # Left by the connections in WAL mode.
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(self.db_file + suffix):
+                os.remove(self.db_file + suffix)
+
+
+class EngineTestCase(ModelTestCase):
+    def test_sqlite_engine(self):
+        engine = Base.get_sql_engine(self.db_path)
+        with engine.connect() as connection:
+            mode = connection.execute("PRAGMA journal_mode").scalar()
+
+        self.assertEqual("wal", mode)
+        self.assertIsInstance(engine.pool, QueuePool)
+        engine.dispose()
+
+    def test_session_factory(self):
+        engine = Base.get_sql_engine(self.db_path)
+        sessions = Base.session_factory(engine)
+        session = sessions()
+
+        self.assertIs(session, sessions())
+        sessions.remove()
+        self.assertIsNot(session, sessions())
+        sessions.remove()
+        engine.dispose()
 
 
 class CompanyTestCase(ModelTestCase):
@@ -48,6 +77,13 @@ class CompanyTestCase(ModelTestCase):
 
         self.assertEqual(2, len(companies))
 
+    def test_fetch_all_after(self):
+        companies = Company.fetch_all(self.session, 5, 0,
+                                      after=self.company_1.id)
+
+        self.assertEqual([self.company_2.id],
+                         [company.id for company in companies])
+
     def test_fetch_one_company(self):
         returned = Company.fetch_one(self.session, 1)
 
@@ -107,6 +143,40 @@ class MatchTestCase(ModelTestCase):
         self.assertEqual(sorted([m.id for m in [match_2, match_3]]),
                          sorted([m.id for m in matches]))
 
+    def test_fetch_all_after(self):
+        match_2 = Match(id=2,
+                        left_company=self.company_2,
+                        right_company=self.company_1)
+        self.session.add(match_2)
+        self.session.flush()
+
+        matches = Match.fetch_all(self.session, 1, 0, after=self.match.id)
+        filtered = Match.fetch_all(self.session, 5, 0,
+                                   company_id=self.company_1.id,
+                                   after=match_2.id)
+
+        self.assertEqual([match_2.id], [match.id for match in matches])
+        self.assertEqual([], filtered)
+
+    def test_fetch_with_companies(self):
+        statements = []
+        engine = self.session.get_bind()
+
+        def listener(connection, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", listener)
+        session = Match.session_from_engine(engine)
+
+        matches = Match.fetch_all(session, 5, 0, with_companies=True)
+        match = Match.fetch_one(session, self.match.id, with_companies=True)
+        session.close()
+        event.remove(engine, "before_cursor_execute", listener)
+
+        self.assertEqual(2, len(statements))
+        self.assertEqual("A", matches[0].left_company.name)
+        self.assertEqual("B", match.right_company.name)
+
     def test_fetch_one_match(self):
         returned = Match.fetch_one(self.session, 1)
 
@@ -126,3 +196,49 @@ class MatchTestCase(ModelTestCase):
         self.session.commit()
 
         self.assertIsNone(Match.fetch_one(self.session, self.match.id))
+
+    def test_delete_all(self):
+        company_3 = Company(source_id=3, source_name="testC", name="C")
+        match_2 = Match(id=2,
+                        left_company=self.company_2,
+                        right_company=company_3)
+        match_3 = Match(id=3,
+                        left_company=company_3,
+                        right_company=company_3)
+        self.session.add_all([company_3, match_2, match_3])
+        self.session.commit()
+
+        deleted = Match.delete_all(self.session, ids=[1, 3, 4],
+                                   company_id=company_3.id)
+        self.session.commit()
+
+        self.assertEqual(1, deleted)
+        self.assertEqual([1, 2], [match.id for match in
+                                  Match.fetch_all(self.session, 5, 0)])
+
+        deleted = Match.delete_all(self.session, source_name="testB")
+        self.session.commit()
+
+        self.assertEqual(2, deleted)
+        self.assertEqual([], Match.fetch_all(self.session, 5, 0))
+
+    def test_delete_all_chunked(self):
+        matches = [Match(id=identifier,
+                         left_company=self.company_1,
+                         right_company=self.company_2)
+                   for identifier in range(2, 2000)]
+        self.session.add_all(matches)
+        self.session.commit()
+
+        deleted = Match.delete_all(self.session, ids=range(1, 3000),
+                                   company_id=self.company_1.id)
+        self.session.commit()
+
+        self.assertEqual(1999, deleted)
+        self.assertEqual([], Match.fetch_all(self.session, 5, 0))
+
+    def test_delete_all_without_filter(self):
+        with self.assertRaises(ValueError):
+            Match.delete_all(self.session)
+
+        self.assertEqual(1, len(Match.fetch_all(self.session, 5, 0)))
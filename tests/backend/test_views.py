@@ -1,8 +1,14 @@
+import os
+import sqlite3
+import tempfile
 import unittest
+from contextlib import closing
 from unittest.mock import ANY, patch
 
 from sharework.backend import init_flask_api
 from sharework.backend.models import Company, Match
+from sharework.backend.views import ListView, decode_cursor, encode_cursor
+from tests import RESOURCES_DIR
 
 
 class CompanyViewsTestCase(unittest.TestCase):
@@ -37,6 +43,36 @@ class CompanyViewsTestCase(unittest.TestCase):
         self.assertEqual(json[0]['id'], self.company_1.id)
         self.assertEqual(json[1]['id'], self.company_2.id)
 
+    @patch('sharework.backend.models.Company.fetch_all')
+    def test_index_next_cursor(self, fetch_all_mock):
+        fetch_all_mock.return_value = [self.company_1, self.company_2]
+        response = self.app.get(
+            '/company?limit=2',
+            headers={"Content-Type": "application/json"},
+        )
+
+        cursor = response.headers[ListView.NEXT_CURSOR_HEADER]
+        self.assertEqual(self.company_2.id, decode_cursor(cursor))
+
+        fetch_all_mock.return_value = [self.company_2]
+        response = self.app.get(
+            f'/company?limit=2&after={cursor}',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn(ListView.NEXT_CURSOR_HEADER, response.headers)
+        fetch_all_mock.assert_called_with(ANY, 2, 0,
+                                          after=self.company_2.id)
+
+    def test_index_invalid_cursor(self):
+        response = self.app.get(
+            '/company?after=invalid',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(400, response.status_code)
+
     @patch('sharework.backend.models.Company.fetch_one')
     def test_get_one(self, fetch_one_mock):
         fetch_one_mock.return_value = self.company_1
@@ -60,6 +96,102 @@ class CompanyViewsTestCase(unittest.TestCase):
         self.assertEqual(404, response.status_code)
 
 
+class CompanyCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.app = init_flask_api().test_client()
+        self.company = Company(id=1, source_id=1, source_name="dataset_A")
+        self.match = Match(id=1, left_company_id=1, right_company_id=2)
+
+    @patch('sharework.backend.models.Company.fetch_one')
+    def test_cached(self, fetch_one_mock):
+        fetch_one_mock.return_value = self.company
+        response = self.app.get('/company/1')
+        again = self.app.get('/company/1')
+
+        self.assertEqual(200, again.status_code)
+        self.assertEqual(response.get_json(), again.get_json())
+        self.assertEqual(response.headers["ETag"], again.headers["ETag"])
+        fetch_one_mock.assert_called_once()
+
+    @patch('sharework.backend.models.Company.fetch_all')
+    def test_cached_per_arguments(self, fetch_all_mock):
+        fetch_all_mock.return_value = [self.company]
+        self.app.get('/company?limit=1')
+        response = self.app.get('/company?limit=1')
+        self.app.get('/company?limit=2')
+
+        self.assertEqual(encode_cursor(1),
+                         response.headers[ListView.NEXT_CURSOR_HEADER])
+        self.assertEqual(2, fetch_all_mock.call_count)
+
+    @patch('sharework.backend.models.Company.fetch_one')
+    def test_not_modified(self, fetch_one_mock):
+        fetch_one_mock.return_value = self.company
+        etag = self.app.get('/company/1').headers["ETag"]
+
+        response = self.app.get('/company/1',
+                                headers={"If-None-Match": etag})
+        modified = self.app.get('/company/1',
+                                headers={"If-None-Match": '"other"'})
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.data)
+        self.assertEqual(etag, response.headers["ETag"])
+        self.assertEqual(200, modified.status_code)
+
+    @patch('sharework.backend.models.Company.fetch_one')
+    def test_not_modified_weak(self, fetch_one_mock):
+        fetch_one_mock.return_value = self.company
+        etag = self.app.get('/company/1').headers["ETag"]
+
+        response = self.app.get('/company/1',
+                                headers={"If-None-Match": f"W/{etag}"})
+        listed = self.app.get('/company/1', headers={
+            "If-None-Match": f'"other", W/{etag}'
+        })
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(304, listed.status_code)
+
+    @patch('sharework.backend.models.Company.fetch_one')
+    def test_not_found_not_cached(self, fetch_one_mock):
+        fetch_one_mock.return_value = None
+        self.app.get('/company/1')
+        response = self.app.get('/company/1')
+
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(2, fetch_one_mock.call_count)
+
+    @patch('sharework.backend.models.Company.fetch_one')
+    @patch('sharework.backend.models.Match.fetch_one')
+    @patch('sharework.backend.models.Match.delete')
+    def test_invalidated_on_delete(self, delete_mock, match_fetch_one_mock,
+                                   fetch_one_mock):
+        fetch_one_mock.return_value = self.company
+        match_fetch_one_mock.return_value = self.match
+        self.app.get('/company/1')
+        self.app.delete('/match/1',
+                        headers={"Content-Type": "application/json"})
+        self.app.get('/company/1')
+
+        self.assertEqual(2, fetch_one_mock.call_count)
+
+    @patch('sharework.backend.models.Company.fetch_one')
+    @patch('sharework.backend.models.Match.delete_all')
+    def test_invalidated_on_bulk_delete(self, delete_all_mock,
+                                        fetch_one_mock):
+        fetch_one_mock.return_value = self.company
+        delete_all_mock.return_value = 1
+        self.app.get('/company/1')
+        self.app.delete('/match?source=dataset_A',
+                        headers={"Content-Type": "application/json"})
+        self.app.get('/company/1')
+
+        self.assertEqual(2, fetch_one_mock.call_count)
+
+
 class MatchViewsTestCase(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -141,6 +273,62 @@ class MatchViewsTestCase(unittest.TestCase):
         fetch_all_mock.assert_called_once_with(ANY, limit, page * limit,
                                                self.company_2.id)
 
+    @patch('sharework.backend.models.Match.fetch_all')
+    def test_index_after_cursor(self, fetch_all_mock):
+        fetch_all_mock.return_value = [self.match_2]
+        response = self.app.get(
+            f'/match?company={self.company_2.id}&page=3'
+            f'&after={encode_cursor(self.match.id)}',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.match_2.id, response.json[0]['id'])
+        fetch_all_mock.assert_called_once_with(ANY, 100, 0,
+                                               self.company_2.id,
+                                               after=self.match.id)
+
+    @patch('sharework.backend.models.Match.fetch_all')
+    def test_index_expand_companies(self, fetch_all_mock):
+        self.match.left_company = self.company_1
+        self.match.right_company = self.company_3
+        fetch_all_mock.return_value = [self.match]
+        response = self.app.get(
+            '/match?expand=companies',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(200, response.status_code)
+        ma = response.json[0]
+        self.assertEqual(self.match.id, ma['id'])
+        self.assertEqual(self.company_1.name, ma['left_company']['name'])
+        self.assertEqual(self.company_3.name, ma['right_company']['name'])
+        fetch_all_mock.assert_called_once_with(ANY, 100, 0, None,
+                                               with_companies=True)
+
+    def test_index_expand_unknown(self):
+        response = self.app.get(
+            '/match?expand=any',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(400, response.status_code)
+
+    @patch('sharework.backend.models.Match.fetch_one')
+    def test_get_one_expand_companies(self, fetch_one_mock):
+        self.match.left_company = self.company_1
+        self.match.right_company = self.company_3
+        fetch_one_mock.return_value = self.match
+        response = self.app.get(
+            '/match/1?expand=companies',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.company_1.id,
+                         response.json['left_company']['id'])
+        fetch_one_mock.assert_called_once_with(ANY, 1, with_companies=True)
+
     @patch('sharework.backend.models.Match.fetch_one')
     def test_get_one(self, fetch_one_mock):
         fetch_one_mock.return_value = self.match
@@ -184,3 +372,77 @@ class MatchViewsTestCase(unittest.TestCase):
 
         self.assertEqual(200, response.status_code)
         delete_mock.assert_called_once()
+
+    @patch('sharework.backend.models.Match.delete_all')
+    def test_delete_many(self, delete_all_mock):
+        delete_all_mock.return_value = 2
+        response = self.app.delete(
+            '/match?source=dataset_A',
+            json={"ids": [1, 2]},
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"deleted": 2}, response.get_json())
+        delete_all_mock.assert_called_once_with(ANY, [1, 2], None,
+                                                "dataset_A")
+
+    @patch('sharework.backend.models.Match.delete_all')
+    def test_delete_many_query_string(self, delete_all_mock):
+        delete_all_mock.return_value = 0
+        response = self.app.delete(
+            '/match?company=4',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(200, response.status_code)
+        delete_all_mock.assert_called_once_with(ANY, None, 4, None)
+
+    def test_delete_many_without_filter(self):
+        response = self.app.delete(
+            '/match',
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(400, response.status_code)
+
+
+class BulkDeleteTestCase(unittest.TestCase):
+    MATCHES = 5000
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "backend_base.sqlite3")
+        init_path = os.path.join(RESOURCES_DIR, "backend", "init_test_db.sql")
+        with closing(sqlite3.connect(self.path)) as connection, \
+                open(init_path, "r") as sql:
+            connection.executescript(sql.read())
+            connection.execute(
+                "INSERT INTO companies (id, source_id, source_name, name) "
+                "VALUES (1, 1, 'dataset_A', 'A'), (2, 1, 'dataset_B', 'B')"
+            )
+            connection.executemany(
+                "INSERT INTO matches (id, left_company_id, right_company_id) "
+                "VALUES (?, 1, 2)",
+                ((identifier,) for identifier in range(1, self.MATCHES + 1))
+            )
+            connection.commit()
+        with patch('sharework.backend.DATA_DIR', self.directory.name):
+            self.app = init_flask_api().test_client()
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.directory.cleanup()
+
+    def test_delete_many_ids(self):
+        # Far beyond the limits of a request line or of the bound
+        # parameters of a SQLite statement.
+        ids = list(range(2, self.MATCHES + 1000))
+        response = self.app.delete('/match', json={"ids": ids})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"deleted": self.MATCHES - 1}, response.get_json())
+        with closing(sqlite3.connect(self.path)) as connection:
+            self.assertEqual([(1,)], connection.execute(
+                "SELECT id FROM matches"
+            ).fetchall())
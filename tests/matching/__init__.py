@@ -0,0 +1,74 @@
+from typing import Type
+
+from sharework.matching.matcher import (
+    CompanyMatcher, PairwiseMatcher,
+    RowMatcher
+)
+from sharework.matching.model import Company
+
+
+def make_company(name: str, website: str = "", phone: str = "",
+                 address: str = "", postal_code: str = None, city: str = "",
+                 country: str = None) -> Company:
+    """Create a company of a test source, located in Paris 15 if it has an
+    address, unless given otherwise."""
+    if postal_code is None:
+        postal_code = "75015.0" if address else ""
+    if country is None:
+        country = "France" if address else ""
+    return Company(
+        source_id=1,
+        source_name="source",
+        name=name,
+        website=website,
+        email="",
+        phone=phone,
+        address=address,
+        postal_code=postal_code,
+        city=city,
+        country=country
+    )
+
+
+class SameScoresMixin:
+    """Check that a RowMatcher engine returns the pairs with a score above 0
+    of the PairwiseMatcher, to mix with a TestCase."""
+    ENGINE: Type[RowMatcher]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.companies_a = [
+            make_company("Alpha", website="alpha.com", phone="+33123456789"),
+            make_company("Beta Group", address="1 rue", city="Paris"),
+            make_company("Gamma", address="2 rue"),
+            make_company("Delta", website="www.delta.com"),
+        ]
+        self.companies_b = [
+            make_company("alpha", website="https://alpha.com"),
+            make_company("Beta", address="1 rue", city="paris"),
+            make_company("Other", website="delta.com", phone="0123456789"),
+            make_company("Delta", website="other.com", address="1 rue"),
+            make_company("Gamma", address="2 rue", city="Lyon"),
+            make_company("Epsilon"),
+        ]
+
+    def _assert_same_scores(self, matcher: CompanyMatcher):
+        companies_b = [matcher.prepare(company)
+                       for company in self.companies_b]
+        engine = self.ENGINE(matcher, companies_b)
+        pairwise = PairwiseMatcher(matcher, companies_b)
+
+        for company in self.companies_a:
+            one = matcher.prepare(company)
+            expected = [match for match in pairwise.match_row(one)
+                        if match.score > 0]
+            self.assertEqual(expected, engine.match_row(one))
+
+    def test_same_scores_strict(self):
+        self._assert_same_scores(CompanyMatcher(strict=True))
+
+    def test_same_scores_not_strict(self):
+        self._assert_same_scores(CompanyMatcher(strict=False))
+
+    def test_same_scores_threshold(self):
+        self._assert_same_scores(CompanyMatcher(strict=False, threshold=0.7))
@@ -0,0 +1,69 @@
+import unittest
+
+from sharework.matching.blocking import (
+    Blocker, BlockingStats, CriterionBlockingKey,
+    NameTokenBlockingKey
+)
+from sharework.matching.criterion import DomainNameCriterion, PhoneCriterion
+from tests.matching import make_company
+
+
+class BlockingKeyTestCase(unittest.TestCase):
+    def test_criterion_key(self):
+        key = CriterionBlockingKey(DomainNameCriterion())
+        company = make_company("A", website="https://www.toto.com/any")
+
+        self.assertEqual({"DomainNameCriterion:toto.com"}, key.keys(company))
+
+    def test_criterion_key_normalized(self):
+        key = CriterionBlockingKey(PhoneCriterion())
+        one = make_company("A", phone="+33 4 56 78 90 12", country="France")
+        two = make_company("B", phone="0456789012", country="France")
+
+        self.assertEqual(key.keys(one), key.keys(two))
+
+    def test_criterion_key_missing_field(self):
+        key = CriterionBlockingKey(DomainNameCriterion())
+
+        self.assertEqual(set(), key.keys(make_company("A")))
+
+    def test_name_tokens(self):
+        key = NameTokenBlockingKey(min_length=3)
+        company = make_company("MyCompany (Paris) SA")
+
+        self.assertEqual({"NameTokenBlockingKey:mycompany",
+                          "NameTokenBlockingKey:paris"}, key.keys(company))
+
+
+class BlockerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.companies = [
+            make_company("Alpha", website="alpha.com"),
+            make_company("Beta", postal_code="75015.0"),
+            make_company("Gamma Group"),
+        ]
+
+    def test_candidates(self):
+        blocker = Blocker()
+        blocker.index(self.companies)
+
+        self.assertEqual({0}, blocker.candidates(
+            make_company("Other", website="http://www.alpha.com")))
+        self.assertEqual({1}, blocker.candidates(
+            make_company("Other", postal_code="75015")))
+        self.assertEqual({2}, blocker.candidates(make_company("gamma")))
+        self.assertEqual(set(), blocker.candidates(make_company("Delta")))
+
+    def test_max_block_size(self):
+        blocker = Blocker(max_block_size=1)
+        blocker.index(self.companies + [make_company("Gamma")])
+
+        self.assertEqual(set(), blocker.candidates(make_company("Gamma Inc")))
+        self.assertEqual({3}, blocker.candidates(make_company("Gamma")))
+
+    def test_reduction_ratio(self):
+        stats = BlockingStats(total_pairs=10, candidate_pairs=2)
+
+        self.assertAlmostEqual(0.8, stats.reduction_ratio)
+        self.assertEqual(0.0, BlockingStats().reduction_ratio)
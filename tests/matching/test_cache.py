@@ -0,0 +1,51 @@
+import unittest
+
+from sharework.matching.cache import LRUCache
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = LRUCache(max_size=2)
+        self.computed = []
+
+    def _compute(self, value):
+        def compute():
+            self.computed.append(value)
+            return value
+        return compute
+
+    def test_miss_then_hit(self):
+        self.assertEqual(1, self.cache.get("a", self._compute(1)))
+        self.assertEqual(1, self.cache.get("a", self._compute(2)))
+
+        self.assertEqual([1], self.computed)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(0.5, self.cache.hit_rate)
+
+    def test_none_cached(self):
+        self.cache.get("a", self._compute(None))
+        self.assertIsNone(self.cache.get("a", self._compute(1)))
+
+        self.assertEqual([None], self.computed)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.get("a", self._compute(1))
+        self.cache.get("b", self._compute(2))
+        self.cache.get("a", self._compute(1))
+        self.cache.get("c", self._compute(3))
+
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(1, self.cache.evictions)
+        self.assertEqual(1, self.cache.get("a", self._compute(-1)))
+        self.assertEqual(2, self.cache.get("b", self._compute(2)))
+        self.assertEqual([1, 2, 3, 2], self.computed)
+
+    def test_clear(self):
+        self.cache.get("a", self._compute(1))
+        self.cache.clear()
+
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.misses)
+        self.assertEqual(0.0, self.cache.hit_rate)
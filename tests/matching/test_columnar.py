@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from sharework.matching.columnar import (
+    NumpyDataDumper, iter_row_groups,
+    load_matches, np, read_metadata
+)
+from sharework.matching.model import Company, CompanyMatch, decode_criteria
+
+
+def _match(source_id: int, score: float, criteria: int) -> CompanyMatch:
+    company_a = Company(str(source_id), "A", "name",
+                        "", "", "", "", "", "", "")
+    company_b = Company(source_id + 1, "B", "name",
+                        "", "", "", "", "", "", "")
+    return CompanyMatch(company_a, company_b, score, criteria)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class NumpyDataDumperTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "matches")
+        self.matches = [_match(position, 0.5, 0b101) for position in range(5)]
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        dumper = NumpyDataDumper(self.path, criteria=["a", "b", "c"])
+        dumper.add(self.matches[0])
+        dumper.add_all(self.matches[1:])
+        dumper.close()
+
+        columns = load_matches(self.path)
+        metadata = read_metadata(self.path)
+
+        self.assertEqual([0, 1, 2, 3, 4], columns["company_a_id"].tolist())
+        self.assertEqual([1, 2, 3, 4, 5], columns["company_b_id"].tolist())
+        self.assertEqual(["A"] * 5, [metadata["strings"][code] for code
+                                     in columns["company_a_source"]])
+        self.assertEqual(["B"] * 5, [metadata["strings"][code] for code
+                                     in columns["company_b_source"]])
+        self.assertEqual(np.float32, columns["score"].dtype)
+        self.assertEqual([0.5] * 5, columns["score"].tolist())
+        self.assertEqual(["a", "c"], decode_criteria(
+            int(columns["success_criteria"][0]), metadata["criteria"]
+        ))
+
+    def test_row_groups(self):
+        dumper = NumpyDataDumper(self.path, row_group_size=2)
+        dumper.add_all(self.matches[:3])
+        dumper.add(self.matches[3])
+        dumper.add(self.matches[4])
+        dumper.close()
+
+        groups = list(iter_row_groups(self.path))
+
+        self.assertEqual([2, 2, 1], [len(group["company_a_id"])
+                                     for group in groups])
+        self.assertIsInstance(groups[0]["company_a_id"], np.memmap)
+        self.assertEqual(list(range(5)),
+                         load_matches(self.path)["company_a_id"].tolist())
+
+    def test_appended(self):
+        dumper = NumpyDataDumper(self.path)
+        dumper.add(self.matches[0])
+        dumper.close()
+        dumper = NumpyDataDumper(self.path)
+        dumper.add(self.matches[1])
+        dumper.close()
+
+        columns = load_matches(self.path)
+
+        self.assertEqual([0, 1], columns["company_a_id"].tolist())
+        self.assertEqual(["A", "B"], read_metadata(self.path)["strings"])
+
+    def test_empty(self):
+        NumpyDataDumper(self.path).close()
+
+        self.assertEqual(0, len(load_matches(self.path)["score"]))
@@ -55,6 +55,20 @@ class FieldCriterionTestCase(CriterionTestCase):
         criterion = FieldCriterion("name", 1)
         self.assertTrue(criterion.match(self.company1, self.company2))
 
+    def test_prepare(self):
+        criterion = FieldCriterion("name", 1)
+        self.company1.name = " MyCompany "
+
+        self.assertEqual("mycompany", criterion.prepare(self.company1))
+        self.assertIsNone(FieldCriterion("city", 1).prepare(self.company1))
+
+    def test_compare_prepared(self):
+        criterion = FieldCriterion("name", 1)
+
+        self.assertTrue(criterion.compare_prepared("name", "name"))
+        self.assertFalse(criterion.compare_prepared("name", "other"))
+        self.assertIsNone(criterion.compare_prepared("name", None))
+
 
 class NameContainedCriterionTestCase(CriterionTestCase):
     def setUp(self) -> None:
@@ -106,6 +120,28 @@ class PhoneCriterionTestCase(CriterionTestCase):
         self.assertIsNotNone(match)
         self.assertFalse(match)
 
+    def test_normalization_cached(self):
+        PhoneCriterion.PHONE_CACHE.clear()
+        self.company1.phone = "0456789012"
+        self.company1.country = "France"
+
+        first = self.criterion.prepare(self.company1)
+        second = self.criterion.prepare(self.company1)
+
+        self.assertEqual("+33456789012", first)
+        self.assertEqual(first, second)
+        self.assertEqual(1, PhoneCriterion.PHONE_CACHE.misses)
+        self.assertEqual(1, PhoneCriterion.PHONE_CACHE.hits)
+
+    def test_parsing_failure_cached(self):
+        PhoneCriterion.PHONE_CACHE.clear()
+        self.company1.phone = "0456789012"
+        self.company1.country = "Nowhere"
+
+        self.assertIsNone(self.criterion.prepare(self.company1))
+        self.assertIsNone(self.criterion.prepare(self.company1))
+        self.assertEqual(1, PhoneCriterion.PHONE_CACHE.hits)
+
 
 class AddressCriterionTestCase(CriterionTestCase):
     def setUp(self) -> None:
@@ -165,6 +201,14 @@ class AddressCriterionTestCase(CriterionTestCase):
         self.assertIsNotNone(match)
         self.assertFalse(match)
 
+    def test_address_prepared(self):
+        self.company1.address = "1"
+        self.company1.postal_code = "12345.0"
+        self.company1.city = "Paris"
+
+        self.assertEqual(("1", "12345", "paris", None),
+                         self.criterion.prepare(self.company1))
+
 
 class DomainNameCriterionTestCase(CriterionTestCase):
     def setUp(self) -> None:
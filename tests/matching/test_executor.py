@@ -0,0 +1,81 @@
+import unittest
+from concurrent.futures.process import ProcessPoolExecutor
+from concurrent.futures.thread import ThreadPoolExecutor
+
+from sharework.matching.executor import (
+    InlineExecutor, PendingWindow,
+    create_executor, estimate_size
+)
+
+
+class InlineExecutorTestCase(unittest.TestCase):
+    def test_initializer(self):
+        calls = []
+        InlineExecutor(initializer=calls.append, initargs=(1,))
+
+        self.assertEqual([1], calls)
+
+    def test_submit(self):
+        future = InlineExecutor().submit(sum, [1, 2])
+
+        self.assertTrue(future.done())
+        self.assertEqual(3, future.result())
+
+    def test_submit_failure(self):
+        future = InlineExecutor().submit(int, "any")
+
+        self.assertIsInstance(future.exception(), ValueError)
+
+
+class CreateExecutorTestCase(unittest.TestCase):
+    def test_backends(self):
+        for backend, expected in (("thread", ThreadPoolExecutor),
+                                  ("process", ProcessPoolExecutor),
+                                  ("inline", InlineExecutor)):
+            executor = create_executor(backend, 1)
+            self.assertIsInstance(executor, expected)
+            executor.shutdown()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_executor("any", 1)
+
+
+class PendingWindowTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.executor = InlineExecutor()
+        self.submitted = []
+
+    def _submit(self, results):
+        for result in results:
+            self.submitted.append(result)
+            yield self.executor.submit(lambda value: value, result)
+
+    def test_unbounded(self):
+        window = PendingWindow()
+
+        futures = window.bounded(self._submit([1, 2, 3]))
+
+        self.assertEqual(1, next(futures).result())
+        self.assertEqual([1, 2, 3], self.submitted)
+
+    def test_max_pending(self):
+        window = PendingWindow(max_pending=2)
+        futures = window.bounded(self._submit([1, 2, 3, 4]))
+
+        self.assertEqual(1, next(futures).result())
+        self.assertEqual([1, 2], self.submitted)
+        self.assertEqual([2, 3, 4], [future.result() for future in futures])
+
+    def test_max_bytes(self):
+        window = PendingWindow(max_bytes=10, sizeof=lambda result: result)
+        futures = window.bounded(self._submit([6, 6, 1, 1]))
+
+        self.assertEqual(6, next(futures).result())
+        self.assertEqual([6, 6], self.submitted)
+        self.assertEqual([6, 1, 1], [future.result() for future in futures])
+        self.assertEqual(0, window._finished_bytes)
+
+    def test_estimate_size(self):
+        self.assertGreater(estimate_size(["a" * 100]), estimate_size(["a"]))
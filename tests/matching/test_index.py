@@ -0,0 +1,78 @@
+import unittest
+
+from sharework.matching.criterion import (
+    AddressCriterion, DomainNameCriterion,
+    FieldCriterion, NameContainedCriterion
+)
+from sharework.matching.index import (
+    EqualityIndex, IndexedMatcher,
+    SubstringIndex
+)
+from sharework.matching.matcher import CompanyMatcher
+from tests.matching import SameScoresMixin
+
+
+class EqualityIndexTestCase(unittest.TestCase):
+    def test_lookup(self):
+        index = EqualityIndex(["a", None, "b", "a"])
+
+        self.assertEqual([0, 3], index.lookup("a"))
+        self.assertEqual([2], index.lookup("b"))
+        self.assertEqual([], index.lookup("c"))
+        self.assertEqual([], index.lookup(None))
+
+
+class SubstringIndexTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.values = ["mycompany inc.", "mycompany", "my", None,
+                       "other company", "mycompany"]
+        self.index = SubstringIndex(self.values)
+
+    def test_lookup_same_as_containment(self):
+        for value in ("mycompany", "company", "inc", "my", "y",
+                      "the mycompany inc. group", "unknown"):
+            expected = {
+                position for position, other in enumerate(self.values)
+                if other is not None and (value in other or other in value)
+            }
+            self.assertEqual(expected, self.index.lookup(value), value)
+
+    def test_lookup_none(self):
+        self.assertEqual(set(), self.index.lookup(None))
+
+
+class IndexedMatcherTestCase(SameScoresMixin, unittest.TestCase):
+    ENGINE = IndexedMatcher
+
+    def test_indexable_criteria(self):
+        self.assertTrue(FieldCriterion("name", 1).indexable)
+        self.assertTrue(DomainNameCriterion().indexable)
+        self.assertTrue(AddressCriterion().indexable)
+        self.assertFalse(NameContainedCriterion().indexable)
+
+    def test_name_contained_index(self):
+        matcher = CompanyMatcher()
+        companies_b = [matcher.prepare(company)
+                       for company in self.companies_b]
+        indexed = IndexedMatcher(matcher, companies_b)
+
+        position = matcher.criteria.index(
+            next(criterion for criterion in matcher.criteria
+                 if isinstance(criterion, NameContainedCriterion))
+        )
+        self.assertIsInstance(indexed.indexes[position], SubstringIndex)
+
+    def test_only_matching_pairs(self):
+        matcher = CompanyMatcher()
+        companies_b = [matcher.prepare(company)
+                       for company in self.companies_b]
+        indexed = IndexedMatcher(matcher, companies_b)
+
+        matches = indexed.match_row(matcher.prepare(self.companies_a[0]))
+
+        self.assertEqual(1, len(matches))
+        self.assertEqual(self.companies_b[0], matches[0].company_b)
+        self.assertEqual(["DomainNameCriterion", "FieldCriterion:name",
+                          "NameContainedCriterion"],
+                         matcher.decode_criteria(matches[0].success_criteria))
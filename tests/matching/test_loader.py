@@ -1,8 +1,16 @@
 import os
+import shutil
+import sqlite3
+import tempfile
 import unittest
+from contextlib import closing
+from unittest.mock import Mock
 
 from sharework.matching import CSVDataLoader
-from sharework.matching.loader import SQLiteDataLoader
+from sharework.matching.loader import (
+    MaterializedDataLoader, SQLiteDataLoader,
+    SnapshotDataLoader
+)
 from sharework.matching.model import Company
 from tests import RESOURCES_DIR
 
@@ -69,3 +77,168 @@ class SQLiteLoaderTestCase(unittest.TestCase):
         )
 
         self.assertEqual([expected_1, expected_2], list(loader.load()))
+
+
+class SQLiteStreamingLoaderTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "dataset.sqlite")
+        with closing(sqlite3.connect(self.path)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE companies (id INTEGER PRIMARY KEY, "
+                "source_id INTEGER, source_name VARCHAR, name VARCHAR, "
+                "website VARCHAR, email VARCHAR, phone VARCHAR, "
+                "address VARCHAR, postal_code VARCHAR, city VARCHAR, "
+                "country VARCHAR)"
+            )
+            self._insert(connection, 3)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.directory.cleanup()
+
+    def _insert(self, connection, amount):
+        with connection:
+            for source_id in range(amount):
+                connection.execute(
+                    "INSERT INTO companies (source_id, source_name, name) "
+                    "VALUES (?, 'source', ?)", (source_id, f"C{source_id}")
+                )
+
+    def test_chunks(self):
+        streamed = SQLiteDataLoader(self.path, "source", chunk_size=2)
+        fetched = SQLiteDataLoader(self.path, "source")
+
+        self.assertEqual(list(fetched.load()), list(streamed.load()))
+        self.assertEqual(["C0", "C1", "C2"],
+                         [company.name for company in streamed.load()])
+
+    def test_snapshot_not_blocking_writers(self):
+        loader = SQLiteDataLoader(self.path, "source", chunk_size=1)
+        companies = loader.load()
+        next(companies)
+
+        with closing(sqlite3.connect(self.path, timeout=0)) as connection:
+            self._insert(connection, 1)
+
+        self.assertEqual(2, len(list(companies)))
+        self.assertEqual(4, len(list(loader.load())))
+
+
+class MaterializedLoaderTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.source = CSVDataLoader(os.path.join(RESOURCES_DIR,
+                                                 "matching", "dataset.csv"))
+        self.source.load = Mock(wraps=self.source.load)
+        self.loader = MaterializedDataLoader(self.source)
+
+    def test_loaded_once(self):
+        expected = list(CSVDataLoader(self.source.path).load())
+
+        self.assertEqual(expected, list(self.loader.load()))
+        self.assertEqual(expected, list(self.loader.load()))
+        self.source.load.assert_called_once_with()
+
+    def test_same_companies(self):
+        first = list(self.loader.load())
+
+        self.assertEqual(2, len(self.loader))
+        for company, again in zip(first, self.loader.load()):
+            self.assertIs(company, again)
+
+    def test_empty_source(self):
+        self.source.load = Mock(return_value=iter([]))
+
+        self.assertEqual([], list(self.loader.load()))
+        self.assertEqual(0, len(self.loader))
+
+    def test_compact(self):
+        loader = MaterializedDataLoader(self.source, compact=True)
+        expected = list(CSVDataLoader(self.source.path).load())
+
+        self.assertEqual(expected, list(loader.load()))
+        self.assertEqual(expected, list(loader.load()))
+        self.source.load.assert_called_once_with()
+
+
+class SnapshotLoaderTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = CSVDataLoader(os.path.join(RESOURCES_DIR,
+                                                 "matching", "dataset.csv"))
+        self.expected = list(self.source.load())
+        self.source.load = Mock(wraps=self.source.load)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.directory.cleanup()
+
+    def test_snapshot_reused(self):
+        first = SnapshotDataLoader(self.source, self.directory.name)
+        second = SnapshotDataLoader(self.source, self.directory.name)
+
+        self.assertEqual(self.expected, list(first.load()))
+        self.assertEqual(self.expected, list(second.load()))
+        self.source.load.assert_called_once_with()
+
+    def test_new_version(self):
+        self.source.version = Mock(return_value="1")
+        loader = SnapshotDataLoader(self.source, self.directory.name)
+        list(loader.load())
+        self.source.version.return_value = "2"
+
+        self.assertEqual(self.expected, list(loader.load()))
+        self.assertEqual(2, self.source.load.call_count)
+
+    def test_without_version(self):
+        self.source.version = Mock(return_value=None)
+        loader = SnapshotDataLoader(self.source, self.directory.name)
+
+        self.assertEqual(self.expected, list(loader.load()))
+        self.assertEqual([], os.listdir(self.directory.name))
+
+    def test_previous_snapshot_removed(self):
+        self.source.version = Mock(return_value="1")
+        loader = SnapshotDataLoader(self.source, self.directory.name)
+        list(loader.load())
+        first = os.listdir(self.directory.name)
+        self.source.version.return_value = "2"
+        list(loader.load())
+
+        self.assertEqual(1, len(first))
+        self.assertEqual(1, len(os.listdir(self.directory.name)))
+        self.assertNotEqual(first, os.listdir(self.directory.name))
+
+    def test_sqlite_version(self):
+        path = os.path.join(RESOURCES_DIR, "matching", "dataset.sqlite")
+        loader = SQLiteDataLoader(path, "dataset.csv", version="1")
+
+        self.assertIsNone(SQLiteDataLoader(path, "dataset.csv").version())
+        self.assertNotEqual(loader.version(),
+                            SQLiteDataLoader(path, "dataset.csv",
+                                             version="2").version())
+        self.assertNotEqual(loader.version(),
+                            SQLiteDataLoader(path, "other",
+                                             version="1").version())
+
+    def test_sqlite_without_version(self):
+        path = os.path.join(self.directory.name, "dataset.sqlite")
+        shutil.copyfile(os.path.join(RESOURCES_DIR, "matching",
+                                     "dataset.sqlite"), path)
+        loader = SnapshotDataLoader(SQLiteDataLoader(path, "dataset.csv"),
+                                    os.path.join(self.directory.name, "a"))
+        list(loader.load())
+
+        # Same length, which no cheap summary of the rows would notice.
+        with closing(sqlite3.connect(path)) as connection, connection:
+            connection.execute("UPDATE companies SET city = 'siraP' "
+                               "WHERE city = 'Paris'")
+
+        self.assertEqual(["siraP", ""],
+                         [company.city for company in loader.load()])
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name,
+                                                     "a")))
@@ -2,6 +2,7 @@ import unittest
 from typing import Optional
 from unittest.mock import Mock
 
+from sharework.matching.blocking import Blocker, BlockingStats
 from sharework.matching.criterion import CompanyCriterion
 from sharework.matching.loader import DataLoader
 from sharework.matching.matcher import CompanyMatcher, SourcesMatcher
@@ -38,6 +39,16 @@ class UnsureCriterion(CompanyCriterion):
         return self.__class__.__name__
 
 
+class ThirdCompanyCriterion(CompanyCriterion):
+
+    def match(self, one: Company, two: Company) -> Optional[bool]:
+        return two.name == '3'
+
+    @property
+    def name(self):
+        return self.__class__.__name__
+
+
 class CompanyMatcherTestCase(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -65,7 +76,7 @@ class CompanyMatcherTestCase(unittest.TestCase):
         self.assertEqual(self.one, match.company_a)
         self.assertEqual(self.two, match.company_b)
         self.assertEqual([SuccessCriterion.__name__],
-                         match.success_criteria)
+                         matcher.decode_criteria(match.success_criteria))
 
     def test_matcher_percentage_strict(self):
         matcher = CompanyMatcher(criteria=[
@@ -79,7 +90,7 @@ class CompanyMatcherTestCase(unittest.TestCase):
         self.assertEqual(self.one, match.company_a)
         self.assertEqual(self.two, match.company_b)
         self.assertEqual([SuccessCriterion.__name__],
-                         match.success_criteria)
+                         matcher.decode_criteria(match.success_criteria))
 
     def test_matcher_percentage_success_not_strict(self):
         matcher = CompanyMatcher(criteria=[
@@ -92,7 +103,58 @@ class CompanyMatcherTestCase(unittest.TestCase):
         self.assertEqual(self.one, match.company_a)
         self.assertEqual(self.two, match.company_b)
         self.assertEqual([SuccessCriterion.__name__],
-                         match.success_criteria)
+                         matcher.decode_criteria(match.success_criteria))
+
+    def test_matcher_threshold(self):
+        matcher = CompanyMatcher(criteria=[
+            SuccessCriterion(5),
+            UnsureCriterion(5),
+        ], strict=True, threshold=0.5)
+
+        self.assertEqual(0.5, matcher.match(self.one, self.two).score)
+        matcher.threshold = 0.6
+        self.assertIsNone(matcher.match(self.one, self.two))
+
+    def test_matcher_threshold_early_exit(self):
+        unsure = Mock(spec=UnsureCriterion(1))
+        unsure.weight = 1
+        unsure.cost = 1
+        matcher = CompanyMatcher(criteria=[
+            unsure,
+            FailureCriterion(5),
+        ], strict=False, threshold=0.9)
+
+        self.assertIsNone(matcher.match(self.one, self.two))
+        unsure.compare_prepared.assert_not_called()
+
+    def test_matcher_threshold_criteria_order(self):
+        matcher = CompanyMatcher(criteria=[
+            UnsureCriterion(1),
+            SuccessCriterion(1),
+            SuccessCriterion(5),
+        ], strict=False, threshold=0.5)
+
+        match = matcher.match(self.one, self.two)
+
+        self.assertEqual(1.0, match.score)
+        self.assertEqual(0b110, match.success_criteria)
+        self.assertEqual([SuccessCriterion.__name__] * 2,
+                         matcher.decode_criteria(match.success_criteria))
+
+    def test_matcher_prepared(self):
+        matcher = CompanyMatcher(criteria=[
+            SuccessCriterion(5),
+            UnsureCriterion(5),
+        ], strict=True)
+
+        one = matcher.prepare(self.one)
+        two = matcher.prepare(self.two)
+        match = matcher.match_prepared(one, two)
+
+        self.assertEqual((self.one, self.one), one.features)
+        self.assertEqual(0.5, match.score)
+        self.assertEqual(self.one, match.company_a)
+        self.assertEqual(self.two, match.company_b)
 
 
 class SourcesMatcherTestCase(unittest.TestCase):
@@ -139,5 +201,147 @@ class SourcesMatcherTestCase(unittest.TestCase):
             self.assertEqual(expected[0], result.company_a)
             self.assertEqual(expected[1], result.company_b)
             self.assertEqual(1.0, result.score)
-            self.assertEqual([SuccessCriterion.__name__],
-                             result.success_criteria)
+            self.assertEqual(0b1, result.success_criteria)
+
+    def test_blocked_product(self):
+        source_a = Mock(spec=DataLoader())
+        source_a.load.return_value = (self.company_1, self.company_2)
+        source_b = Mock(spec=DataLoader())
+        source_b.load.return_value = (self.company_3,
+                                      self.company_4,
+                                      self.company_5)
+        blocker = Mock(spec=Blocker())
+        blocker.strict = False
+        blocker.stats = BlockingStats()
+        blocker.candidates.side_effect = lambda company: {
+            self.company_1: {2, 0},
+            self.company_2: set(),
+        }[company]
+
+        matcher = SourcesMatcher(source_a, source_b,
+                                 matcher=self.success_matcher,
+                                 blocker=blocker)
+
+        result = [future.result() for future in matcher.compare()]
+
+        self.assertEqual(2, len(result))
+        self.assertEqual(self.company_3, result[0].company_b)
+        self.assertEqual(self.company_5, result[1].company_b)
+        self.assertEqual(6, blocker.stats.total_pairs)
+        self.assertEqual(2, blocker.stats.candidate_pairs)
+
+    def test_blocked_product_strict(self):
+        source_a = Mock(spec=DataLoader())
+        source_a.load.return_value = (self.company_1,)
+        source_b = Mock(spec=DataLoader())
+        source_b.load.return_value = (self.company_3, self.company_4)
+        blocker = Mock(spec=Blocker())
+        blocker.strict = True
+        blocker.stats = BlockingStats()
+        blocker.candidates.return_value = {1}
+
+        matcher = SourcesMatcher(source_a, source_b,
+                                 matcher=self.success_matcher,
+                                 blocker=blocker)
+
+        result = [future.result() for future in matcher.compare()]
+
+        self.assertEqual([self.company_3, self.company_4],
+                         [match.company_b for match in result])
+        self.assertEqual([0.0, 1.0], [match.score for match in result])
+        self.assertEqual(0, result[0].success_criteria)
+
+    def test_compare_rows(self):
+        source_a = Mock(spec=DataLoader())
+        source_a.load.return_value = (self.company_1, self.company_2)
+        source_b = Mock(spec=DataLoader())
+        source_b.load.return_value = (self.company_3, self.company_4)
+
+        matcher = SourcesMatcher(source_a, source_b,
+                                 matcher=self.success_matcher)
+
+        rows = [future.result() for future in matcher.compare_rows()]
+
+        self.assertEqual(2, len(rows))
+        for row, company_a in zip(rows, (self.company_1, self.company_2)):
+            self.assertEqual([company_a, company_a],
+                             [match.company_a for match in row])
+            self.assertEqual([self.company_3, self.company_4],
+                             [match.company_b for match in row])
+
+    def test_source_b_loaded_once(self):
+        source_a = Mock(spec=DataLoader())
+        source_a.load.return_value = (self.company_1,)
+        source_b = Mock(spec=DataLoader())
+        source_b.load.return_value = (self.company_3, self.company_4)
+
+        matcher = SourcesMatcher(source_a, source_b,
+                                 matcher=self.success_matcher)
+        pairs = [future.result() for future in matcher.compare()]
+        rows = [future.result() for future in matcher.compare_rows()]
+
+        self.assertEqual(2, len(pairs))
+        self.assertEqual(2, len(rows[0]))
+        source_b.load.assert_called_once_with()
+
+    def test_compare_rows_chunks(self):
+        source_a = Mock(spec=DataLoader())
+        source_a.load.return_value = (self.company_1, self.company_2,
+                                      self.company_3)
+        source_b = Mock(spec=DataLoader())
+        source_b.load.return_value = (self.company_4, self.company_5)
+
+        matcher = SourcesMatcher(source_a, source_b,
+                                 matcher=self.success_matcher,
+                                 backend="inline")
+
+        chunks = [future.result()
+                  for future in matcher.compare_rows(chunk_size=2)]
+
+        self.assertEqual([4, 2], [len(chunk) for chunk in chunks])
+        self.assertEqual(self.company_3, chunks[1][0].company_a)
+
+    def test_compare_rows_processes(self):
+        companies = [
+            Company(source_id=position, source_name="source",
+                    name=str(position), website="", email="", phone="",
+                    address="", postal_code="", city="", country="")
+            for position in range(3)
+        ]
+        source_a = Mock(spec=DataLoader())
+        source_a.load.return_value = companies
+        source_b = Mock(spec=DataLoader())
+        source_b.load.return_value = companies
+
+        matcher = SourcesMatcher(source_a, source_b,
+                                 matcher=self.success_matcher,
+                                 worker_amount=2, backend="process")
+
+        matches = [match for future in matcher.compare_rows(chunk_size=2)
+                   for match in future.result()]
+        matcher.stop()
+
+        self.assertEqual(9, len(matches))
+        self.assertEqual([(a.source_id, b.source_id)
+                          for a in companies for b in companies],
+                         [(match.company_a.source_id,
+                           match.company_b.source_id) for match in matches])
+
+    def test_compare_rows_threshold(self):
+        source_a = Mock(spec=DataLoader())
+        source_a.load.return_value = (self.company_1,)
+        source_b = Mock(spec=DataLoader())
+        source_b.load.return_value = (self.company_2, self.company_3)
+
+        matcher = SourcesMatcher(source_a, source_b,
+                                 matcher=CompanyMatcher([
+                                     ThirdCompanyCriterion(1)
+                                 ]),
+                                 backend="inline")
+
+        matches = [match
+                   for future in matcher.compare_rows(threshold=0.5)
+                   for match in future.result()]
+
+        self.assertEqual([self.company_3],
+                         [match.company_b for match in matches])
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from sharework.matching.model import Company, CompanyStore, decode_criteria
+
+
+class CompanyStoreTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.companies = [
+            Company(1, "source", "A", "url.com", "a@b.com", "+33123456789",
+                    "1 rue de l'allée", "75015", "Paris", "France"),
+            Company(2, "source", "B", None, "", "", "", "33000",
+                    "Bordeaux", "France"),
+            Company("3", "source", "Ç", None, "", "", "", "75015",
+                    "Paris", "France"),
+        ]
+        self.store = CompanyStore(self.companies)
+
+    def test_round_trip(self):
+        self.assertEqual(3, len(self.store))
+        self.assertEqual(self.companies, list(self.store))
+        self.assertEqual(self.companies[1], self.store[1])
+        self.assertEqual(self.companies[2], self.store[-1])
+
+    def test_types_kept(self):
+        self.assertIsNone(self.store[1].website)
+        self.assertEqual(2, self.store[1].source_id)
+        self.assertEqual("3", self.store[2].source_id)
+
+    def test_distinct_values_stored_once(self):
+        country = self.store.columns["country"]
+
+        self.assertEqual(b"France", country.buffer)
+        self.assertEqual([0, 0, 0], list(country.codes))
+
+    def test_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.store[3]
+
+    def test_empty(self):
+        self.assertEqual([], list(CompanyStore([])))
+
+    def test_saved(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "store")
+            self.store.save(path)
+            store = CompanyStore.open(path)
+
+            self.assertEqual(self.companies, list(store))
+            self.assertEqual(self.companies[2], store[2])
+            self.assertIsInstance(store.columns["name"].codes, memoryview)
+
+    def test_saved_empty(self):
+        with tempfile.TemporaryDirectory() as directory:
+            CompanyStore([]).save(directory)
+
+            self.assertEqual([], list(CompanyStore.open(directory)))
+
+
+class DecodeCriteriaTestCase(unittest.TestCase):
+    def test_decode(self):
+        names = ["a", "b", "c"]
+
+        self.assertEqual([], decode_criteria(0, names))
+        self.assertEqual(["a", "c"], decode_criteria(0b101, names))
@@ -0,0 +1,242 @@
+import bz2
+import csv
+import gzip
+import lzma
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from contextlib import closing
+from unittest.mock import Mock
+
+from sharework.matching.model import Company, CompanyMatch
+from sharework.matching.persistence import (
+    AsyncDataDumper, CSVDataDumper,
+    DataDumper, SqliteDataDumper
+)
+
+
+class CSVDataDumperTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "matches.csv")
+        company_a = Company(1, "A", "name", "", "", "", "", "", "", "")
+        company_b = Company(2, "B", "name", "", "", "", "", "", "", "")
+        self.match = CompanyMatch(company_a, company_b, 0.5, 0b101)
+        self.expected = [CSVDataDumper.FIELDS,
+                         ["A", "1", "B", "2", "0.5", "5"]]
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.directory.cleanup()
+
+    def test_streamed(self):
+        dumper = CSVDataDumper(self.path)
+        dumper.add(self.match)
+        dumper.flush()
+
+        with open(self.path, newline="") as output:
+            self.assertEqual(self.expected, list(csv.reader(output)))
+        dumper.close()
+
+    def test_add_all(self):
+        dumper = CSVDataDumper(self.path)
+        dumper.add_all([self.match, self.match])
+        dumper.close()
+
+        with open(self.path, newline="") as output:
+            self.assertEqual(self.expected + self.expected[1:],
+                             list(csv.reader(output)))
+
+    def test_compressed(self):
+        for compression, opener in (("gzip", gzip.open), ("bz2", bz2.open),
+                                    ("lzma", lzma.open)):
+            path = f"{self.path}.{compression}"
+            dumper = CSVDataDumper(path, compression=compression)
+            dumper.add(self.match)
+            dumper.close()
+
+            with opener(path, "rt", newline="") as output:
+                self.assertEqual(self.expected, list(csv.reader(output)))
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            CSVDataDumper(self.path, compression="any")
+
+
+class SqliteDataDumperTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "matches.sqlite3")
+        company_a = Company(1, "A", "name", "", "", "", "", "", "", "")
+        company_b = Company(2, "B", "name", "", "", "", "", "", "", "")
+        self.match = CompanyMatch(company_a, company_b, 0.5, 0b101)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.directory.cleanup()
+
+    def _rows(self):
+        with closing(sqlite3.connect(self.path)) as connection:
+            return connection.execute(
+                "SELECT company_a_source, company_a_id, company_b_source, "
+                "company_b_id, score, success_criteria FROM matches"
+            ).fetchall()
+
+    def test_wal_mode(self):
+        dumper = SqliteDataDumper(self.path)
+        mode = dumper.connection.execute("PRAGMA journal_mode").fetchone()
+        dumper.close()
+
+        self.assertEqual("wal", mode[0])
+
+    def test_batch_size(self):
+        dumper = SqliteDataDumper(self.path, batch_size=2)
+        dumper.add(self.match)
+        self.assertEqual([], self._rows())
+
+        dumper.add(self.match)
+        self.assertEqual([("A", 1, "B", 2, 0.5, 0b101)] * 2, self._rows())
+        dumper.close()
+
+    def test_batch_bytes(self):
+        dumper = SqliteDataDumper(self.path, batch_bytes=1)
+        dumper.add(self.match)
+
+        self.assertEqual(1, len(self._rows()))
+        dumper.close()
+
+    def test_add_all(self):
+        dumper = SqliteDataDumper(self.path)
+        dumper.add(self.match)
+        dumper.add_all([self.match] * 3)
+
+        self.assertEqual(4, len(self._rows()))
+        self.assertEqual([], dumper.lines)
+        dumper.close()
+
+    def test_close(self):
+        dumper = SqliteDataDumper(self.path)
+        dumper.add(self.match)
+        dumper.close()
+
+        self.assertEqual(1, len(self._rows()))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            dumper.connection.execute("SELECT 1")
+
+
+class SqliteLegacyMatchesTestCase(unittest.TestCase):
+    CRITERIA = ["DomainNameCriterion", "FieldCriterion:name",
+                "PhoneCriterion"]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "matches.sqlite3")
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                "CREATE TABLE matches (id INTEGER PRIMARY KEY, "
+                "company_a_source VARCHAR (64), company_a_id INTEGER, "
+                "company_b_source VARCHAR (64), company_b_id INTEGER, "
+                "score FLOAT, success_criteria VARCHAR (512))"
+            )
+            connection.executemany(
+                "INSERT INTO matches VALUES (?, 'A', 1, 'B', 2, 0.5, ?)",
+                [(1, "DomainNameCriterion;PhoneCriterion"),
+                 (2, "FieldCriterion;PhoneCriterion"),
+                 (3, "")]
+            )
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.directory.cleanup()
+
+    def _query(self, sql):
+        with closing(sqlite3.connect(self.path)) as connection:
+            return connection.execute(sql).fetchall()
+
+    def test_converted(self):
+        SqliteDataDumper(self.path, criteria=self.CRITERIA).close()
+
+        self.assertEqual(
+            [(1, 0b101, "integer"), (2, 0b110, "integer"), (3, 0, "integer")],
+            self._query("SELECT id, success_criteria, "
+                        "typeof(success_criteria) FROM matches")
+        )
+        self.assertEqual([], self._query(
+            "SELECT name FROM sqlite_master WHERE name = 'matches_legacy'"
+        ))
+
+    def test_kept_aside(self):
+        SqliteDataDumper(self.path, criteria=self.CRITERIA[:2]).close()
+
+        self.assertEqual([], self._query("SELECT * FROM matches"))
+        self.assertEqual(3, len(self._query("SELECT * FROM matches_legacy")))
+        self.assertEqual("INTEGER", self._query(
+            "SELECT type FROM pragma_table_info('matches') "
+            "WHERE name = 'success_criteria'"
+        )[0][0])
+
+        # Converted once the criteria are known.
+        SqliteDataDumper(self.path, criteria=self.CRITERIA).close()
+        self.assertEqual(3, len(self._query("SELECT * FROM matches")))
+
+
+class AsyncDataDumperTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.dumper = Mock(spec=DataDumper())
+        self.match = Mock(spec=CompanyMatch)
+
+    def test_add_and_flush(self):
+        dumper = AsyncDataDumper(self.dumper)
+        dumper.add(self.match)
+        dumper.add_all([self.match, self.match])
+        dumper.flush()
+
+        self.dumper.add.assert_called_once_with(self.match)
+        self.dumper.add_all.assert_called_once_with([self.match, self.match])
+        self.dumper.flush.assert_called_once_with()
+        dumper.close()
+
+    def test_close(self):
+        dumper = AsyncDataDumper(self.dumper)
+        dumper.add(self.match)
+        dumper.close()
+        dumper.close()
+
+        self.dumper.add.assert_called_once_with(self.match)
+        self.dumper.close.assert_called_once_with()
+        with self.assertRaises(ValueError):
+            dumper.add(self.match)
+
+    def test_bounded_queue(self):
+        writing = threading.Event()
+        self.dumper.add.side_effect = lambda match: writing.wait()
+        dumper = AsyncDataDumper(self.dumper, max_queued=1)
+        dumper.add(self.match)
+        dumper.add(self.match)
+
+        blocked = threading.Thread(target=dumper.add, args=(self.match,))
+        blocked.start()
+        blocked.join(0.1)
+        self.assertTrue(blocked.is_alive())
+
+        writing.set()
+        blocked.join()
+        dumper.close()
+        self.assertEqual(3, self.dumper.add.call_count)
+
+    def test_writer_failure(self):
+        self.dumper.add.side_effect = OSError("disk full")
+        dumper = AsyncDataDumper(self.dumper)
+        dumper.add(self.match)
+
+        with self.assertRaises(OSError):
+            dumper.flush()
+        with self.assertRaises(OSError):
+            dumper.close()
+        self.dumper.close.assert_called_once_with()
@@ -0,0 +1,29 @@
+import unittest
+
+from sharework.matching.matcher import CompanyMatcher
+from sharework.matching.vectorized import VectorizedMatcher, np
+from tests.matching import SameScoresMixin
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class VectorizedMatcherTestCase(SameScoresMixin, unittest.TestCase):
+    ENGINE = VectorizedMatcher
+
+    def test_missing_values(self):
+        matcher = CompanyMatcher(strict=False)
+        companies_b = [matcher.prepare(company)
+                       for company in self.companies_b]
+        vectorized = VectorizedMatcher(matcher, companies_b)
+
+        matches = vectorized.match_row(matcher.prepare(self.companies_a[2]))
+
+        # The address is ignored since the city is missing on one side.
+        self.assertEqual(1, len(matches))
+        self.assertEqual(self.companies_b[4], matches[0].company_b)
+        self.assertEqual(1.0, matches[0].score)
+        self.assertEqual(["FieldCriterion:name", "NameContainedCriterion"],
+                         matcher.decode_criteria(matches[0].success_criteria))
+
+        matcher.strict = True
+        matches = vectorized.match_row(matcher.prepare(self.companies_a[2]))
+        self.assertEqual((5 + 1) / 17, matches[0].score)